@@ -1,325 +1,280 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-import sys, os, math
-from attr import s
-from pulp import *
+import sys, os, math, re, argparse
+from solver import ClauseStore
+
+# Rule clauses of every board size encoded so far, shared by all puzzles of that size
+rule_cache = {}
 
 def s_to_ch(l):
     ''' Convert string to corresponding number
 
     Args: 
-        l: string to be converted
+        l: string to be converted, a letter from "A" (10) to "Z" (35) in either case
 
     Return:
-        Correct number 
+        Correct number
+
+    Raises:
+        ValueError: If the string is not a single letter
     '''
-    ac = 0
-    if l == "A":
-        ac = 10
-    elif l == "B":
-        ac = 11
-    elif l == "C":
-        ac = 12
-    elif l == "D":
-        ac = 13
-    elif l == "E":
-        ac = 14
-    elif l == "F":
-        ac = 15
-    elif l == "G":
-        ac = 16
-    else:
-        ac = 0
-    return ac
+    if len(l) == 1 and l.isascii() and l.isalpha():
+        return ord(l.upper()) - ord("A") + 10
+    raise ValueError(f"'{l}' is not a number or an empty cell")
 
-def read_sudoku_from_file(path):
-    ''' Convert lines in file to numerical Sudoku
+def read_sudoku_from_file(path, out_dir='testset'):
+    ''' Convert every line in a file to a DIMACS file, numbered from 1 in the order of the lines
 
     Args: 
-        out_file: File to be written to
-        in_file: Input file, this has to be a string from the path
+        path: Input file, this has to be a string from the path
+        out_dir: Directory the DIMACS files are written to, created if needed
 
     Return:
-        List of every row in a Sudoku
+        Number of Sudokus converted
     '''
-    sudoku_in = []
+    count = 0
     try:
+        os.makedirs(out_dir, exist_ok=True)
         with open(path, "r") as f:
-            for name, line in enumerate(f.readlines()):
-                sudoku_in = []
-                rt = int(math.sqrt(len(line)))
-                for i in range(0, int(math.sqrt(len(line)))):
-                #converting string line from file to integer list
-                    line = line.replace('\n', '')
-                    int_line = [int(char) if char.isnumeric() else s_to_ch(char) for char in line]
-                    sudoku_in.append(int_line[i*rt:i*rt+rt])
-                make_cnf_dimacs(sudoku_in, 'testset/'+str(name + 1)+'.cnf')
-            return name + 1
+            for line in f:
+                if not line.strip():
+                    continue
+                count += 1
+                make_cnf_dimacs(parse_sudoku(line), os.path.join(out_dir, str(count)+'.cnf'))
+        return count
     except Exception as e:
         sys.exit(e)
 
+def parse_sudoku(line):
+    ''' Convert one line of a puzzle file to a numerical Sudoku
 
-def num_to_cnff(i,j,num, invert,sixteen):
-    ''' Numbers to DIMACS
+    Args:
+        line: String of the puzzle, row by row, with '.' or '0' for empty cells. Numbers are single
+            characters (letters from "A" for 10 and up), or tokens separated by commas or spaces,
+            which may have several digits, as needed for 25x25 and larger boards. Between commas,
+            an empty token is an empty cell
 
-    Args: 
-        i: Row number
-        j: Column number
-        num: Value of the number
-        invert: Boolean, True if negation else False
-        Sixteen: Boolean, True if 16x16 Sudoku, False otherwise
+    Return:
+        List of every row in a Sudoku
+
+    Raises:
+        ValueError: If a token is neither a number nor an empty cell, or the board is empty, not N x N
+            with a square N (so that boxes are square), or holds a number above N
+    '''
+    line = line.strip()
+    #comma separated tokens (empty ones are empty cells), space separated tokens, else one character per cell
+    if re.search(r"[,;]", line):
+        tokens = re.split(r"\s*[,;]\s*", line)
+    elif re.search(r"\s", line):
+        tokens = line.split()
+    else:
+        tokens = list(line)
+    rt = int(math.sqrt(len(tokens)))
+    if rt == 0 or rt * rt != len(tokens):
+        raise ValueError(f"{len(tokens)} cells do not make a square board")
+    if math.isqrt(rt) ** 2 != rt:
+        raise ValueError(f"a {rt}x{rt} board has no square boxes")
+    #converting tokens from file to integer list
+    int_line = [int(token) if token.isdigit() else 0 if token in ('', '.') else s_to_ch(token) for token in tokens]
+    #with the dense numbering of cell_var, a number above N would be read as a number of another cell
+    if max(int_line) > rt:
+        raise ValueError(f"a number is larger than {rt}")
+    return [int_line[i*rt:i*rt+rt] for i in range(rt)]
+
+
+def peer_pairs(n):
+    ''' Find every pair of distinct cells that share a row, column or box, each pair once
+
+    Args:
+        n: Dimension of the board
 
     Return:
-        Correct DIMACS
+        Two arrays with the row and column (from 1) of the first cells, and two with those of the second cells
     '''
-    if sixteen:    
-        s = -1 if invert else 1
-        clause = s * int(int(i)*17*17+int(j)*17+int(num))
-    else:    
-        s = -1 if invert else 1
-        clause = s * int(str(i)+str(j)+str(num))   
-    return clause
+    import numpy as np
+    block = int(math.sqrt(n))
+    first, second = np.triu_indices(n*n, 1)
+    r1, c1 = np.divmod(first, n)
+    r2, c2 = np.divmod(second, n)
+    peers = (r1 == r2) | (c1 == c2) | ((r1 // block == r2 // block) & (c1 // block == c2 // block))
+    return r1[peers] + 1, c1[peers] + 1, r2[peers] + 1, c2[peers] + 1
 
-def constraint(a, j, i, num, row, sixteen):
-    ''' Convert row or column to DIMACS
+def rule_arrays(n):
+    ''' Generate the rule clauses of an empty n x n Sudoku as arrays, each clause exactly once
 
-    Args: 
-        a: Row or column number clause 2
-        j: Row or column number clause 1
-        i: Row or column number
-        num: Value in box
-        row: Boolean, True if it's a row
-        sixteen: Boolean, True if it's a 16x16 Sudoku, False otherwise
+    Args:
+        n: Dimension of the board
 
     Return:
-        Correct DIMACS 
+        Array of the n literals of every cell clause, and array of the 2 literals of every
+        at-most-one clause, numbered by cell_var
     '''
-    if sixteen:
-        s = 17
-        if row:
-            clause_2 = -1 * int(int(i)*s*s + int(a)*s + int(num))
-            clause_1 = -1 * int(int(i)*s*s + int(j)*s + int(num))
-        else:
-            clause_2 = -1 * int(int(a)*s*s + int(i)*s + int(num))
-            clause_1 = -1 * int(int(j)*s*s + int(i)*s + int(num))
-    else:
-        if row:
-            clause_2 = -1 * int(str(i) + str(a) + str(num))
-            clause_1 = -1 * int(str(i) + str(j) + str(num))
-        else:
-            clause_2 = -1 * int(str(a) + str(i) + str(num))
-            clause_1 = -1 * int(str(j) + str(i) + str(num))
-        
-    return [(clause_1, clause_2)]#[clause_1, clause_2]
-
-def constraint_box(i,j,a,d,num,sixteen):
-    ''' Convert to correct DIMACS
+    import numpy as np
+    values = np.arange(1, n + 1)
+    #every cell holds at least one number
+    rows, cols = np.divmod(np.arange(n*n), n)
+    cells = cell_var(n, rows[:, None] + 1, cols[:, None] + 1, values[None, :])
+    #two cells of the same row, column or box never hold the same number
+    r1, c1, r2, c2 = peer_pairs(n)
+    pairs = np.stack([-cell_var(n, r1[:, None], c1[:, None], values[None, :]).ravel(),
+                      -cell_var(n, r2[:, None], c2[:, None], values[None, :]).ravel()], axis=1)
+    return cells, pairs
+
+def make_cnf_dimacs(sudoku_in, out_file):
+    ''' Convert Sudoku to DIMACS
 
     Args: 
-        i: Row number clause 1
-        j: Column number clause 1
-        a: Row number clause 2
-        d: Column number clause 2
-        num: Value at box
-        sixteen: Boolean, True if 16x16 Sudoku, False otherwise
+        sudoku_in: Sudoku to be converted
+        out_file: path to file
 
     Return:
-        Correct DIMACS 
+        Number of clauses written
     '''
-    if sixteen:
-        clause_1 = -1 * (int(i)*17*17+ int(j)*17 + int(num))
-        clause_2 = -1 * (int(a)*17*17+ int(d)*17 + int(num))
-    else:
-        clause_1 = -1 * int(str(i) + str(j) + str(num))
-        clause_2 = -1 * int(str(a) + str(d) + str(num))
+    import numpy as np
+    #dimension of puzzle
+    n = len(sudoku_in[0])
+    cells, pairs = rule_arrays(n)
+    #the given numbers
+    grid = np.asarray(sudoku_in)
+    given_rows, given_cols = np.nonzero(grid)
+    givens = cell_var(n, given_rows + 1, given_cols + 1, grid[given_rows, given_cols])
 
-    return [(clause_1, clause_2)]
+    clauses_number = len(cells) + len(givens) + len(pairs)
+    with open(out_file, "w") as f:
+        f.write(f"p cnf {n**3} {clauses_number}\n")
+        f.write(((("%d " * n) + "0\n") * len(cells)) % tuple(cells.ravel().tolist()))
+        f.write(("%d 0\n" * len(givens)) % tuple(givens.tolist()))
+        f.write(("%d %d 0\n" * len(pairs)) % tuple(pairs.ravel().tolist()))
+    return clauses_number
 
+def cell_var(n, i, j, num):
+    ''' Number the variable of a cell holding a number, densely from 1 to n**3
 
-#write at the beginning of file
-def insert(originalfile, string):
-    ''' Write number of variables and clauses at the beginning of the file
+    Args:
+        n: Dimension of the board
+        i: Row number, from 1
+        j: Column number, from 1
+        num: Value in the cell, from 1
 
-    Args: 
-        original file: path to file
-        string: string to be inserted
+    Return:
+        Variable of the cell holding the number
     '''
-    with open(originalfile,'r') as f:
-        with open('newfile.txt','w') as f2:
-            f2.write(string + '\n')
-            f2.write(f.read())
-    os.rename('newfile.txt', originalfile)
+    return ((i-1)*n + (j-1))*n + num
 
-def make_cnf_dimacs(sudoku_in, out_file):
-    ''' Convert Sudoku to DIMACS
+def var_cell(n, var):
+    ''' Inverse of cell_var
 
-    Args: 
-        sudoku_in: Sudoku to be converted
-        out_file: path to file
+    Args:
+        n: Dimension of the board
+        var: Variable, from 1 to n**3
 
     Return:
-        Correct DIMACS
+        Tuple of the row number, column number and value, all from 1
     '''
-    clauses_number = 0
-    #dimension of puzzle and minimal number of bits to represent one number
-    n = len(sudoku_in[0])
-    block = int(math.sqrt(n))
-    num_of_bits = len(bin(n)[2:])
-    sixteen = False
+    cell, num = divmod(var - 1, n)
+    i, j = divmod(cell, n)
+    return i + 1, j + 1, num + 1
+
+def build_rules(n):
+    ''' Generate the rule clauses of an empty n x n Sudoku, each exactly once
 
+    Args:
+        n: Dimension of the board
+
+    Return:
+        List of clauses, as tuples of literals numbered by cell_var
     '''
-    Defining Rows, Cols and Values of Sudoku Board
+    cells, pairs = rule_arrays(n)
+    return [tuple(clause) for clause in cells.tolist()] + [tuple(clause) for clause in pairs.tolist()]
+
+def rule_clauses(n, cache_dir=None):
+    ''' Get the rule clauses of an n x n Sudoku, built once per board size and kept in memory
+
+    Args:
+        n: Dimension of the board
+        cache_dir: Optional directory where the rules are also cached on disk, as a memory-mapped .cnfb file
+
+    Return:
+        ClauseStore with the rules, shared by every puzzle of that size
     '''
-    numbers = [str(i) for i in range(1, n + 1)]
-    Rows = numbers
-    Cols = numbers
-    Values = numbers
+    if n in rule_cache:
+        return rule_cache[n]
+    cache_file = os.path.join(cache_dir, f"rules{n}.cnfb") if cache_dir else None
+    if cache_file and os.path.exists(cache_file):
+        rule_cache[n] = ClauseStore.from_cnfb(cache_file)
+    else:
+        rule_cache[n] = ClauseStore(build_rules(n))
+        if cache_file:
+            os.makedirs(cache_dir, exist_ok=True)
+            rule_cache[n].to_cnfb(cache_file)
+    return rule_cache[n]
 
-    if len(Values) == 16:
-        sixteen = True
-    
+def encode_sudoku(sudoku_in, cache_dir=None, preprocess=False):
+    ''' Convert a Sudoku to clauses in memory, without writing any file
 
-    Subgrids =[]
-    for i in range(block):
-        for j in range(block):
-            Subgrids += [[(int(Rows[block*i+k]),int(Cols[block*j+l])) for k in range(block) for l in range(block)]]
+    Args:
+        sudoku_in: Sudoku to be converted
+        cache_dir: Optional directory of the on-disk rule cache, see rule_clauses
+        preprocess: Boolean, True to eliminate candidates on the grid first and encode only the
+            clauses that are left (see preprocess.encode_residual), which has the same solutions
 
-    with open(out_file, "w") as f:
-            
-        for r in Rows:
-            for c in Cols:
-                for v in Values:
-                    if sixteen:
-                        a = int(r)*17*17 + int(c)*17 + int(v)                   
-                    else:
-                        a = int(str(r) + str(c) + str(v))
-                    f.write(f"{a} ")
-                f.write("0\n")
-
-        #NOTE constraint 1 check box
-        for i in range(1, n+1):
-            for j in range (1, n+1): 
-                curr_num = sudoku_in[i-1][j-1]#[(i-1)//n][(j-1)%n]
-                if curr_num != 0:
-                    #add all non-zero numbers
-                    a = num_to_cnff(i,j, curr_num, False,sixteen)
-                    f.write(f"{a} 0\n")
-                    clauses_number += 1
-                for b in Subgrids:
-                    for r,c in b:
-                        if i is r and j is c:
-                            for a, d in b:
-                                if curr_num != 0:
-                                    z = constraint_box(i,j,a,d,curr_num,sixteen)
-                                    for dd, s in z:
-                                        if dd == s:
-                                            continue
-                                        else:
-                                            f.write(f"{dd} ")
-                                            f.write(f"{s} ")
-                                            f.write("0\n")
-                                            clauses_number += 1
-                                else:
-                                    for v in Values:
-                                        z = constraint_box(i,j,a,d, v,sixteen)
-                                        for dd, s in z:
-                                            if dd == s:
-                                                continue
-                                            else:
-                                                f.write(f"{dd} ")
-                                                f.write(f"{s} ")
-                                                f.write("0\n")
-                                                clauses_number += 1
-                            break
-                        else:
-                            continue
-                
-                #NOTE: CONSTRAINT 2
-                #Row
-                for a in range(1, n+1):
-                    if a != j and curr_num != 0:
-                        z = constraint(a, j, i,curr_num, True,sixteen)
-                        for c, d in z:
-                            if c == d:
-                                continue
-                            else:
-                                f.write(f"{c} ")
-                                f.write(f"{d} ")
-                                f.write("0\n")
-                                clauses_number += 1
-                    elif a != j & curr_num == 0:
-                        for v in Values:
-                            z = constraint(a, j, i, v, True,sixteen)
-                            for c, d in z:
-                                if c == d:
-                                    continue
-                                else:
-                                    f.write(f"{c} ")
-                                    f.write(f"{d} ")
-                                    f.write("0\n")
-                                    clauses_number += 1
-                    else:
-                        continue
-                       
-                #Column
-                for b in range(1, n+1):
-                    if b != j & curr_num != 0:
-                        z = constraint(b, i, j,curr_num, False,sixteen)
-                        for c, d in z:
-                            if c == d:
-                                continue
-                            else:
-                                f.write(f"{c} ")
-                                f.write(f"{d} ")
-                                f.write("0\n")
-                                clauses_number += 1
-                    elif b != j & curr_num == 0:
-                        for v in Values:
-                            z = constraint(b,i,j, v, False,sixteen)
-                            for c, d in z:
-                                if c == d:
-                                    continue
-                                else:
-                                    f.write(f"{c} ")
-                                    f.write(f"{d} ")
-                                    f.write("0\n")
-                                    clauses_number += 1
-                    else:
-                        continue
-
-    nn_bits= n*n*num_of_bits
-    sol = dupe(out_file,nn_bits)
-    return sol
-
-def dupe(out_file, n):
-    ''' Remove duplicates and write to file
+    Return:
+        ClauseStore with the rules of the board size and a unit clause per given number,
+        or the residual clauses if preprocess is True
+    '''
+    if preprocess:
+        #imported here, as preprocess itself depends on this module
+        from preprocess import encode_residual
+        return encode_residual(sudoku_in)
+    n = len(sudoku_in[0])
+    store = rule_clauses(n, cache_dir).copy()
+    for literal in given_literals(sudoku_in):
+        store.add((literal,))
+    return store
 
-    Args: 
-        out_file: Path to correct file
-        n: number of variables
+def given_literals(sudoku_in):
+    ''' Get the literals of the given numbers of a Sudoku, e.g. as assumptions for DPLL.solve_assuming
+
+    Args:
+        sudoku_in: Sudoku with 0 for empty cells
+
+    Return:
+        List of the variables of the given numbers, numbered by cell_var
     '''
-    lines_set = open(out_file, 'r').readlines()
-    lines_set = set(lines_set)
-    lines_set = sorted(lines_set,reverse = True)
-    out  = open(out_file, 'w')
-    for line in lines_set:
-        out.write(line)   
-    out.close()
-    insert(out_file, f"p cnf {n} {len(lines_set)}")
+    n = len(sudoku_in[0])
+    return [cell_var(n, i, j, sudoku_in[i-1][j-1]) for i in range(1, n+1) for j in range(1, n+1) if sudoku_in[i-1][j-1] != 0]
 
+def encode_puzzle(line, cache_dir=None, preprocess=False):
+    ''' Convert one line of a puzzle file to clauses in memory
 
-def main():
+    Args:
+        line: String of the puzzle, row by row
+        cache_dir: Optional directory of the on-disk rule cache, see rule_clauses
+        preprocess: Boolean, True to encode only the clauses left after grid-level preprocessing, see encode_sudoku
+
+    Return:
+        ClauseStore ready to be passed to DPLL.find_solution
+    '''
+    return encode_sudoku(parse_sudoku(line), cache_dir, preprocess)
+
+
+def main(argv=None):
     '''
     Convert txt-file to DIMACS in txt-file
 
     Args: 
-        in_file: Path to file that has to be converted
+        argv: Command line arguments, the path to the file that has to be converted and optionally
+            the output directory; sys.argv when None
 
     Return:
-        Path string 
-    '''   
-    sudoku_in = read_sudoku_from_file()
+        Number of Sudokus converted
+    '''
+    parser = argparse.ArgumentParser(description="Convert a file of puzzles, one per line, to DIMACS files.")
+    parser.add_argument("puzzles", help="path to the puzzle file")
+    parser.add_argument("-o", "--out-dir", default="testset", help="directory the DIMACS files are written to")
+    args = parser.parse_args(argv)
+    return read_sudoku_from_file(args.puzzles, args.out_dir)
 
 if __name__ == "__main__":
     main()
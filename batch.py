@@ -0,0 +1,161 @@
+import argparse
+import csv
+import os
+import threading
+from functools import partial
+from multiprocessing import Pool, cpu_count
+from time import time
+from typing import Iterator, List, Optional, Sequence, Set, Tuple
+
+import SAT
+from solver import DPLL, HEURISTICS
+
+HEADER = ("Heuristic", "Sudoku", "Time", "Branching Frequency", "Restarts", "Status", "Solutions", "Error")
+
+
+def solve_job(job: Tuple[str, int, str], max_time: Optional[float] = None, max_splits: Optional[int] = None,
+              max_solutions: int = 1, preprocess: bool = False) -> List:
+    """ Solves one puzzle of a batch with one heuristic.
+
+    Args:
+        job (Tuple[str, int, str]): The heuristic, the number of the puzzle (its line number) and the puzzle line.
+        max_time (Optional[float], optional): The number of seconds after which the solver gives up. Defaults to None.
+        max_splits (Optional[int], optional): The number of splits after which the solver gives up. Defaults to None.
+        max_solutions (int, optional): The number of solutions to count before stopping, 2 to check uniqueness. Defaults to 1.
+        preprocess (bool, optional): Whether to solve only the clauses left after grid-level preprocessing. Defaults to False.
+
+    Returns:
+        List: The row of the results file for this job, with the status 'UNKNOWN' if a budget ran out,
+            or 'ERROR' and the message if the puzzle line or the options are invalid.
+    """
+    heuristic, number, line = job
+    dpll = DPLL()
+    initial = time()
+    try:
+        store = SAT.encode_puzzle(line, preprocess=preprocess)
+        initial = time()
+        dpll.find_solution(store, heuristic, max_time=max_time, max_splits=max_splits, max_solutions=max_solutions)
+    except ValueError as e:
+        # A bad line gets its row like any other, so the batch goes on and a resume skips it
+        return [heuristic, number, time() - initial, 0, 0, 'ERROR', 0, str(e)]
+    delta = time() - initial
+    return [heuristic, number, delta, dpll.split_counter, dpll.restart_counter, dpll.status, dpll.solution_count, ""]
+
+
+def finished_jobs(out_path: str) -> Set[Tuple[str, str]]:
+    """ Reads which jobs a partially written results file already holds, so they can be skipped.
+        A last row cut off by a crash is removed from the file.
+
+    Args:
+        out_path (str): The path to the results file.
+
+    Returns:
+        Set[Tuple[str, str]]: The (heuristic, puzzle number) pairs that are done.
+    """
+    if not os.path.exists(out_path):
+        return set()
+    with open(out_path, 'rb+') as f:
+        data = f.read()
+        # Drop an incomplete last row
+        if data and not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+    with open(out_path, 'r', newline='') as f:
+        return {(row[0], row[1]) for row in csv.reader(f) if len(row) == len(HEADER) and tuple(row) != HEADER}
+
+
+def read_jobs(in_path: str, heuristics: Sequence[str], done: Set[Tuple[str, str]]) -> Iterator[Tuple[str, int, str]]:
+    """ Streams the jobs of a puzzle file, one puzzle per line, without loading the whole file.
+
+    Args:
+        in_path (str): The path to the puzzle file.
+        heuristics (Sequence[str]): The heuristics every puzzle is solved with.
+        done (Set[Tuple[str, str]]): The (heuristic, puzzle number) pairs to skip.
+
+    Yields:
+        Tuple[str, int, str]: The heuristic, the number of the puzzle and the puzzle line.
+    """
+    with open(in_path, 'r') as f:
+        for number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            for heuristic in heuristics:
+                if (heuristic, str(number)) not in done:
+                    yield heuristic, number, line
+
+
+def solve_batch(in_path: str, out_path: str = "results.csv", heuristics: Sequence[str] = ("0", "1", "2"),
+                processes: int = None, chunksize: int = 16, resume: bool = True,
+                max_time: Optional[float] = None, max_splits: Optional[int] = None, max_solutions: int = 1,
+                preprocess: bool = False) -> int:
+    """ Solves every puzzle of a file with a process pool, appending each result to a csv file as soon as it is done.
+        Only a bounded window of jobs is in flight, so memory does not grow with the size of the input.
+
+    Args:
+        in_path (str): The path to the puzzle file, one puzzle per line.
+        out_path (str, optional): The path to the results file. Defaults to "results.csv".
+        heuristics (Sequence[str], optional): The heuristics every puzzle is solved with. Defaults to ("0", "1", "2").
+        processes (int, optional): The number of worker processes. Defaults to the number of CPUs.
+        chunksize (int, optional): The number of jobs sent to a worker at once. Defaults to 16.
+        resume (bool, optional): Whether to skip the jobs already in the results file instead of starting over. Defaults to True.
+        max_time (Optional[float], optional): The number of seconds each puzzle may take. Defaults to None.
+        max_splits (Optional[int], optional): The number of splits each puzzle may take. Defaults to None.
+        max_solutions (int, optional): The number of solutions to count per puzzle, 2 to check uniqueness. Defaults to 1.
+        preprocess (bool, optional): Whether to solve only the clauses left after grid-level preprocessing. Defaults to False.
+
+    Returns:
+        int: The number of jobs solved by this call.
+    """
+    processes = processes or cpu_count()
+    done = finished_jobs(out_path) if resume else set()
+    # Bounds the jobs that were read from the input but whose result was not written yet
+    window = threading.BoundedSemaphore(processes * chunksize * 4)
+
+    def throttled(jobs: Iterator) -> Iterator:
+        for job in jobs:
+            window.acquire()
+            yield job
+
+    solved = 0
+    with open(out_path, "a" if resume else "w", newline='') as f:
+        writer = csv.writer(f)
+        if f.tell() == 0:
+            writer.writerow(HEADER)
+        with Pool(processes=processes) as pool:
+            job = partial(solve_job, max_time=max_time, max_splits=max_splits, max_solutions=max_solutions,
+                          preprocess=preprocess)
+            for row in pool.imap_unordered(job, throttled(read_jobs(in_path, heuristics, done)), chunksize):
+                writer.writerow(row)
+                f.flush()
+                window.release()
+                solved += 1
+    return solved
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """ Runs the batch command line.
+
+    Args:
+        argv (Optional[List[str]], optional): The command line arguments. Defaults to sys.argv.
+    """
+    parser = argparse.ArgumentParser(description="Solve a file of puzzles, one per line, and stream the results to a csv file.")
+    parser.add_argument("puzzles", help="path to the puzzle file")
+    parser.add_argument("results", nargs="?", default="results.csv", help="path to the results csv file")
+    parser.add_argument("-H", "--heuristics", nargs="+", default=["0", "1", "2"], choices=HEURISTICS,
+                        help="heuristic numbers to run")
+    parser.add_argument("-p", "--processes", type=int, default=None, help="number of worker processes")
+    parser.add_argument("-c", "--chunksize", type=int, default=16, help="jobs sent to a worker at once")
+    parser.add_argument("-t", "--max-time", type=float, default=None, help="seconds each puzzle may take")
+    parser.add_argument("-s", "--max-splits", type=int, default=None, help="splits each puzzle may take")
+    parser.add_argument("-u", "--count-solutions", type=int, default=1, metavar="LIMIT",
+                        help="count solutions up to LIMIT per puzzle, 2 checks uniqueness")
+    parser.add_argument("-P", "--preprocess", action="store_true",
+                        help="eliminate candidates on the grid first and solve only the clauses that are left")
+    parser.add_argument("--fresh", action="store_true", help="overwrite existing results instead of resuming")
+    args = parser.parse_args(argv)
+    solve_batch(args.puzzles, args.results, args.heuristics, args.processes, args.chunksize, not args.fresh,
+                args.max_time, args.max_splits, args.count_solutions, args.preprocess)
+
+
+if __name__ == "__main__":
+    main()
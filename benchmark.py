@@ -0,0 +1,193 @@
+import argparse
+import json
+import math
+import random
+import resource
+import sys
+from multiprocessing import Pool
+from time import perf_counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import SAT
+from solver import DPLL, HEURISTICS
+
+# Fraction of the cells that keep their number, per difficulty grade
+GRADES = {'easy': 0.55, 'medium': 0.42, 'hard': 0.32}
+# Metrics where a higher value is a regression, and the smallest change that is not noise
+LOWER_IS_BETTER = {'encode_time': 0.05, 'propagation_time': 0.05, 'search_time': 0.05, 'splits': 10, 'peak_rss_kb': 4096, 'unknown': 0}
+
+
+def solution_grid(n: int, rnd: random.Random) -> List[List[int]]:
+    """ Generates a random solved n x n Sudoku by shuffling a valid pattern.
+
+    Args:
+        n (int): The dimension of the board.
+        rnd (random.Random): The seeded random generator.
+
+    Returns:
+        List[List[int]]: The rows of the solved Sudoku.
+    """
+    block = int(math.sqrt(n))
+
+    def shuffled(groups: int) -> List[int]:
+        # Shuffle the groups, then the lines within every group
+        return [group * block + line for group in rnd.sample(range(groups), groups) for line in rnd.sample(range(block), block)]
+    rows, cols = shuffled(block), shuffled(block)
+    numbers = rnd.sample(range(1, n + 1), n)
+    return [[numbers[(block * (r % block) + r // block + c) % n] for c in cols] for r in rows]
+
+
+def make_puzzle(n: int, fraction: float, rnd: random.Random) -> str:
+    """ Generates a puzzle line by keeping a fraction of the cells of a random solved Sudoku.
+
+    Args:
+        n (int): The dimension of the board.
+        fraction (float): The fraction of the cells that keep their number.
+        rnd (random.Random): The seeded random generator.
+
+    Returns:
+        str: The puzzle, row by row, with '.' for empty cells and letters from 'A' for numbers above 9.
+    """
+    grid = solution_grid(n, rnd)
+    kept = set(rnd.sample(range(n * n), round(fraction * n * n)))
+    tokens = [str(value) if value < 10 else chr(ord('A') + value - 10) for row in grid for value in row]
+    return "".join(token if cell in kept else '.' for cell, token in enumerate(tokens))
+
+
+def make_corpus(sizes: Sequence[int] = (4, 9, 16), per_grade: int = 5, seed: int = 0) -> Dict[int, List[Tuple[str, str]]]:
+    """ Generates a reproducible corpus of puzzles of every size and grade.
+
+    Args:
+        sizes (Sequence[int], optional): The board dimensions. Defaults to (4, 9, 16).
+        per_grade (int, optional): The number of puzzles per size and grade. Defaults to 5.
+        seed (int, optional): The seed of the generator. Defaults to 0.
+
+    Returns:
+        Dict[int, List[Tuple[str, str]]]: The (grade, puzzle line) pairs of every board dimension.
+    """
+    rnd = random.Random(seed)
+    return {n: [(grade, make_puzzle(n, fraction, rnd)) for grade, fraction in GRADES.items() for _ in range(per_grade)]
+            for n in sizes}
+
+
+def run_config(n: int, heuristic: str, puzzles: List[Tuple[str, str]], max_time: Optional[float]) -> Dict:
+    """ Measures one heuristic on the puzzles of one size. Meant to run in its own process, so that the
+        peak resident memory belongs to this configuration alone.
+
+    Args:
+        n (int): The dimension of the board.
+        heuristic (str): The number of the heuristic.
+        puzzles (List[Tuple[str, str]]): The (grade, puzzle line) pairs.
+        max_time (Optional[float]): The number of seconds each puzzle may take.
+
+    Returns:
+        Dict: The metrics of the configuration.
+    """
+    metrics = dict.fromkeys(('encode_time', 'propagation_time', 'search_time'), 0.0)
+    metrics.update(puzzles=len(puzzles), solved=0, unknown=0, splits=0)
+    for _, line in puzzles:
+        start = perf_counter()
+        store = SAT.encode_puzzle(line)
+        metrics['encode_time'] += perf_counter() - start
+        # Everything up to the first split counts as propagation
+        start = perf_counter()
+        DPLL().find_solution(store, heuristic, max_splits=0)
+        propagation = perf_counter() - start
+        dpll = DPLL()
+        start = perf_counter()
+        dpll.find_solution(store, heuristic, max_time=max_time)
+        total = perf_counter() - start
+        metrics['propagation_time'] += min(propagation, total)
+        metrics['search_time'] += max(total - propagation, 0.0)
+        metrics['splits'] += dpll.split_counter
+        metrics['solved'] += dpll.status == 'SAT'
+        metrics['unknown'] += dpll.status == 'UNKNOWN'
+    elapsed = metrics['encode_time'] + metrics['propagation_time'] + metrics['search_time']
+    metrics['throughput'] = len(puzzles) / elapsed if elapsed else 0.0
+    metrics['peak_rss_kb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return metrics
+
+
+def run_benchmark(sizes: Sequence[int] = (4, 9, 16), heuristics: Sequence[str] = HEURISTICS, per_grade: int = 5,
+                  seed: int = 0, max_time: Optional[float] = 5.0) -> Dict[str, Dict]:
+    """ Runs every heuristic on the corpus of every size, each configuration in a fresh process.
+
+    Args:
+        sizes (Sequence[int], optional): The board dimensions. Defaults to (4, 9, 16).
+        heuristics (Sequence[str], optional): The numbers of the heuristics. Defaults to every heuristic.
+        per_grade (int, optional): The number of puzzles per size and grade. Defaults to 5.
+        seed (int, optional): The seed of the corpus. Defaults to 0.
+        max_time (Optional[float], optional): The number of seconds each puzzle may take. Defaults to 5.0.
+
+    Returns:
+        Dict[str, Dict]: The metrics of every configuration, keyed like "9x9/h3".
+    """
+    corpus = make_corpus(sizes, per_grade, seed)
+    configs = [(n, heuristic, corpus[n], max_time) for n in sizes for heuristic in heuristics]
+    with Pool(processes=1, maxtasksperchild=1) as pool:
+        results = pool.starmap(run_config, configs, chunksize=1)
+    return {f"{n}x{n}/h{heuristic}": metrics for (n, heuristic, _, _), metrics in zip(configs, results)}
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """ Compares benchmark results against a saved baseline.
+
+    Args:
+        results (Dict[str, Dict]): The metrics of every configuration.
+        baseline (Dict[str, Dict]): The saved metrics of every configuration.
+        tolerance (float): The relative change that is accepted, e.g. 0.25 for 25%.
+
+    Returns:
+        List[str]: A description of every regression.
+    """
+    regressions = []
+    for key, metrics in results.items():
+        if key not in baseline:
+            continue
+        for metric, noise in LOWER_IS_BETTER.items():
+            old, new = baseline[key][metric], metrics[metric]
+            if new > old * (1 + tolerance) and new - old > noise:
+                regressions.append(f"{key} {metric}: {old:.4g} -> {new:.4g}")
+        old, new = baseline[key]['throughput'], metrics['throughput']
+        if new * (1 + tolerance) < old:
+            regressions.append(f"{key} throughput: {old:.4g} -> {new:.4g}")
+    return regressions
+
+
+def report(results: Dict[str, Dict]) -> None:
+    """ Prints the metrics of every configuration as a table.
+
+    Args:
+        results (Dict[str, Dict]): The metrics of every configuration.
+    """
+    print(f"{'config':<10} {'solved':>8} {'unknown':>8} {'encode s':>9} {'propagate s':>12} {'search s':>9} "
+          f"{'splits':>9} {'peak MB':>8} {'puzzles/s':>10}")
+    for key, m in results.items():
+        print(f"{key:<10} {m['solved']:>4}/{m['puzzles']:<3} {m['unknown']:>8} {m['encode_time']:>9.3f} "
+              f"{m['propagation_time']:>12.3f} {m['search_time']:>9.3f} {m['splits']:>9} "
+              f"{m['peak_rss_kb'] / 1024:>8.1f} {m['throughput']:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the solver on a seeded corpus of puzzles.")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[4, 9, 16], help="board dimensions")
+    parser.add_argument("-H", "--heuristics", nargs="+", default=list(HEURISTICS), help="heuristic numbers")
+    parser.add_argument("--per-grade", type=int, default=5, help="puzzles per size and difficulty grade")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the corpus")
+    parser.add_argument("-t", "--max-time", type=float, default=5.0, help="seconds each puzzle may take")
+    parser.add_argument("--save", help="write the results to this baseline file")
+    parser.add_argument("--baseline", help="compare the results against this baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="accepted relative change before failing")
+    args = parser.parse_args()
+
+    results = run_benchmark(args.sizes, args.heuristics, args.per_grade, args.seed, args.max_time)
+    report(results)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print("REGRESSION", regression)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,210 @@
+import math
+from time import time
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+import decode
+import preprocess
+from solver import DPLL
+
+# Number of set bits of every 16-bit value, for numpy versions without np.bitwise_count
+POPCOUNT16 = np.array([bin(value).count('1') for value in range(1 << 16)], dtype=np.uint8)
+
+# Largest board dimension, as the candidates of a cell must fit in a 64-bit mask
+MAX_SIZE = 64
+
+# Index arrays of the boxes of every board size seen so far
+box_cache = {}
+
+
+def popcount(masks: np.ndarray) -> np.ndarray:
+    """ Counts the candidates of every cell.
+
+    Args:
+        masks (np.ndarray): The candidate bitmasks.
+
+    Returns:
+        np.ndarray: The number of set bits of every bitmask.
+    """
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(masks)
+    masks = masks.astype(np.uint64)
+    return sum(POPCOUNT16[(masks >> np.uint64(shift)) & np.uint64(0xFFFF)] for shift in range(0, 64, 16))
+
+
+def box_index(n: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """ Computes index arrays to go between cells and boxes of an n x n board.
+
+    Args:
+        n (int): The dimension of the board.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]: The row and column of every (box, position)
+            pair, and the box and position of every (row, column) pair.
+    """
+    if n not in box_cache:
+        block = int(math.sqrt(n))
+        box, position = np.divmod(np.arange(n * n), n)
+        rows = (box // block) * block + position // block
+        cols = (box % block) * block + position % block
+        box_of = np.empty((n, n), dtype=np.intp)
+        position_of = np.empty((n, n), dtype=np.intp)
+        box_of[rows, cols] = box
+        position_of[rows, cols] = position
+        box_cache[n] = (rows.reshape(n, n), cols.reshape(n, n), box_of, position_of)
+    return box_cache[n]
+
+
+def to_bitboards(sudokus: Sequence[List]) -> np.ndarray:
+    """ Stacks Sudokus of the same size into candidate bitboards, one bitmask per cell.
+
+    Args:
+        sudokus (Sequence[List]): The rows of every Sudoku, with 0 for empty cells.
+
+    Returns:
+        np.ndarray: The (B, N, N) candidate bitmasks, bit v - 1 standing for number v.
+
+    Raises:
+        ValueError: If the board is larger than MAX_SIZE.
+    """
+    grids = np.asarray(sudokus, dtype=np.int64)
+    n = grids.shape[-1]
+    if n > MAX_SIZE:
+        raise ValueError(f"bitboards hold at most {MAX_SIZE} candidates per cell, not {n}")
+    dtype = np.uint16 if n <= 16 else np.uint32 if n <= 32 else np.uint64
+    full = dtype((1 << n) - 1)
+    return np.where(grids > 0, np.left_shift(dtype(1), np.maximum(grids - 1, 0).astype(dtype)), full).astype(dtype)
+
+
+def hidden_singles(units: np.ndarray, full: int) -> Tuple[np.ndarray, np.ndarray]:
+    """ Finds the numbers that have a single possible cell left in their unit.
+
+    Args:
+        units (np.ndarray): The (B, N, N) candidates, one unit per row.
+        full (int): The bitmask of all numbers.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The candidates of every cell that are hidden singles of its unit,
+            and which puzzles have a number with no possible cell left in some unit.
+    """
+    once = np.zeros(units.shape[:2], dtype=units.dtype)
+    twice = np.zeros(units.shape[:2], dtype=units.dtype)
+    for k in range(units.shape[2]):
+        twice |= once & units[:, :, k]
+        once |= units[:, :, k]
+    missing = (once != full).any(axis=1)
+    return units & (once & ~twice)[:, :, None], missing
+
+
+def propagate(candidates: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """ Applies row, column and box elimination, naked singles and hidden singles to a stack of bitboards,
+        all puzzles at once, until none of them changes anymore.
+
+    Args:
+        candidates (np.ndarray): The (B, N, N) candidate bitmasks.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The reduced candidates, and which puzzles were found to have no solution.
+    """
+    candidates = candidates.copy()
+    b, n, _ = candidates.shape
+    full = (1 << n) - 1
+    rows, cols, box_of, position_of = box_index(n)
+    failed = np.zeros(b, dtype=bool)
+    active = np.arange(b)
+    while active.size:
+        board = candidates[active]
+        # Eliminate the numbers of solved cells from their peers (naked singles)
+        single = popcount(board) == 1
+        solved = np.where(single, board, 0).astype(board.dtype)
+        row_taken = np.bitwise_or.reduce(solved, axis=2)
+        col_taken = np.bitwise_or.reduce(solved, axis=1)
+        box_taken = np.bitwise_or.reduce(solved[:, rows, cols], axis=2)
+        # Two solved cells of a unit holding the same number leave fewer bits than solved cells
+        conflict = (popcount(row_taken) != single.sum(axis=2)).any(axis=1) | \
+            (popcount(col_taken) != single.sum(axis=1)).any(axis=1) | \
+            (popcount(box_taken) != single[:, rows, cols].sum(axis=2)).any(axis=1)
+        taken = row_taken[:, :, None] | col_taken[:, None, :] | box_taken[:, box_of]
+        reduced = np.where(single, board, board & ~taken).astype(board.dtype)
+        # Place the numbers that have a single possible cell left in a unit (hidden singles)
+        in_rows, missing_rows = hidden_singles(reduced, full)
+        in_cols, missing_cols = hidden_singles(reduced.transpose(0, 2, 1), full)
+        in_boxes, missing_boxes = hidden_singles(reduced[:, rows, cols], full)
+        forced = in_rows | in_cols.transpose(0, 2, 1) | in_boxes[:, box_of, position_of]
+        conflict |= missing_rows | missing_cols | missing_boxes | (popcount(forced) > 1).any(axis=(1, 2))
+        reduced = np.where(forced != 0, forced, reduced).astype(board.dtype)
+        conflict |= (reduced == 0).any(axis=(1, 2))
+        changed = (reduced != board).any(axis=(1, 2))
+        candidates[active] = reduced
+        failed[active[conflict]] = True
+        active = active[changed & ~conflict]
+    return candidates, failed
+
+
+def propagate_grids(sudokus: Sequence[List]) -> Tuple[np.ndarray, np.ndarray, List[Optional[str]]]:
+    """ Solves a batch of Sudokus of the same size as far as bitboard propagation goes, without any search.
+
+    Args:
+        sudokus (Sequence[List]): The rows of every Sudoku, with 0 for empty cells.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, List[Optional[str]]]: The (B, N, N) candidates left, the (B, N, N) solved grids
+            (all 0 when unsolved), and the status of every puzzle, None for the puzzles that still need a search.
+    """
+    candidates, failed = propagate(to_bitboards(sudokus))
+    b, n, _ = candidates.shape
+    grids = np.zeros((b, n, n), dtype=np.int64)
+    solved = ~failed & (popcount(candidates) == 1).all(axis=(1, 2))
+    grids[solved] = np.log2(candidates[solved]).astype(np.int64) + 1
+    status = ['UNSAT' if fail else 'SAT' if done else None for fail, done in zip(failed, solved)]
+    return candidates, grids, status
+
+
+def search_candidates(candidates: Union[np.ndarray, List[List[int]]], option: str = '3', deadline: Optional[float] = None,
+                      **options) -> Tuple[str, Optional[np.ndarray]]:
+    """ Searches the candidates that propagation left in one Sudoku with DPLL, on clauses over those candidates only.
+
+    Args:
+        candidates (Union[np.ndarray, List[List[int]]]): The (N, N) candidate bitmasks, as an array or rows of ints.
+        option (str, optional): The number of the DPLL heuristic. Defaults to '3'.
+        deadline (Optional[float], optional): The time.time() by which the search must stop, None for no deadline.
+            A puzzle already past its deadline gets the status 'UNKNOWN' without a search. Defaults to None.
+        **options: Further options of DPLL.find_solution, such as max_time.
+
+    Returns:
+        Tuple[str, Optional[np.ndarray]]: The status of the puzzle, and its (N, N) solved grid if it is 'SAT'.
+    """
+    n = len(candidates)
+    if deadline is not None:
+        options = dict(options, max_time=deadline - time())
+        if options['max_time'] <= 0:
+            return 'UNKNOWN', None
+    dpll = DPLL()
+    dpll.find_solution(preprocess.encode_candidates(n, [int(mask) for row in candidates for mask in row]), option, **options)
+    return dpll.status, decode.decode_solution(n, dpll.solution) if dpll.status == 'SAT' else None
+
+
+def solve_grids(sudokus: Sequence[List], option: str = '3', deadlines: Optional[Sequence[Optional[float]]] = None,
+                **options) -> Tuple[np.ndarray, List[str]]:
+    """ Solves a batch of Sudokus of the same size with bitboard propagation.
+        Only the puzzles that propagation leaves unresolved are encoded to clauses and searched by DPLL.
+
+    Args:
+        sudokus (Sequence[List]): The rows of every Sudoku, with 0 for empty cells.
+        option (str, optional): The number of the DPLL heuristic for unresolved puzzles. Defaults to '3'.
+        deadlines (Optional[Sequence[Optional[float]]], optional): The time.time() by which the search of every
+            puzzle must stop, None for no deadline. Puzzles past their deadline get the status 'UNKNOWN'. Defaults to None.
+        **options: Further options of DPLL.find_solution, such as max_time.
+
+    Returns:
+        Tuple[np.ndarray, List[str]]: The (B, N, N) solved grids (all 0 when unsolved), and the status of every puzzle.
+    """
+    candidates, grids, status = propagate_grids(sudokus)
+    for index, outcome in enumerate(status):
+        if outcome is None:
+            deadline = deadlines[index] if deadlines is not None else None
+            status[index], grid = search_candidates(candidates[index], option, deadline, **options)
+            if grid is not None:
+                grids[index] = grid
+    return grids, status
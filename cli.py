@@ -0,0 +1,36 @@
+import importlib
+import sys
+from typing import List, Optional
+
+# The module and description of every command; a module is only imported when its command runs
+COMMANDS = {
+    'encode': ('SAT', "convert a file of puzzles, one per line, to DIMACS files"),
+    'solve': ('test_single', "solve a DIMACS or .cnfb file and write the solution"),
+    'batch': ('batch', "solve a file of puzzles with every heuristic and stream the results to a csv file"),
+}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """ Runs one command, passing the remaining arguments to the main function of its module.
+
+    Args:
+        argv (Optional[List[str]], optional): The command and its arguments. Defaults to sys.argv.
+
+    Returns:
+        int: The exit status, non-zero for a solve that ends UNSAT or UNKNOWN (see test_single.EXIT_STATUS).
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS:
+        print("usage: cli.py {" + ",".join(COMMANDS) + "} ...\n")
+        for command, (_, description) in COMMANDS.items():
+            print(f"  {command:<8} {description}")
+        print("\nRun 'cli.py COMMAND -h' for the arguments of a command.")
+        return 0 if argv and argv[0] in ('-h', '--help') else 2
+    module = importlib.import_module(COMMANDS[argv[0]][0])
+    result = module.main(argv[1:])
+    # Commands that report a solver status map it to an exit status
+    return getattr(module, 'EXIT_STATUS', {}).get(result, 0)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
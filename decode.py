@@ -0,0 +1,121 @@
+import json
+import math
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
+
+
+def decode_solution(n: int, solution: Dict[int, bool]) -> np.ndarray:
+    """ Maps a solution of DPLL back to the grid of an n x n Sudoku, using the numbering of SAT.cell_var.
+
+    Args:
+        n (int): The dimension of the board.
+        solution (Dict[int, bool]): The value of every assigned variable.
+
+    Returns:
+        np.ndarray: The (N, N) grid, with 0 for cells without a true variable.
+    """
+    variables = np.fromiter((variable for variable, value in solution.items() if value), dtype=np.int64)
+    # Variables beyond the board, if any, are not cells
+    variables = variables[(variables >= 1) & (variables <= n ** 3)]
+    cells, nums = np.divmod(variables - 1, n)
+    grid = np.zeros(n * n, dtype=np.int64)
+    grid[cells] = nums + 1
+    return grid.reshape(n, n)
+
+
+def check_grids(grids: np.ndarray, puzzles: Optional[np.ndarray] = None) -> np.ndarray:
+    """ Verifies a stack of grids: every row, column and box holds every number once,
+        and every given number of the puzzles is kept.
+
+    Args:
+        grids (np.ndarray): The (B, N, N) or (N, N) grids.
+        puzzles (Optional[np.ndarray], optional): The puzzles of the grids, with 0 for empty cells. Defaults to None.
+
+    Returns:
+        np.ndarray: Whether every grid is a valid solution, as a (B,) array or a single bool for one grid.
+    """
+    grids = np.asarray(grids)
+    single = grids.ndim == 2
+    if single:
+        grids = grids[None]
+    b, n, _ = grids.shape
+    block = int(math.sqrt(n))
+    numbers = np.arange(1, n + 1)
+    boxes = grids.reshape(b, block, block, block, block).transpose(0, 1, 3, 2, 4).reshape(b, n, n)
+    valid = (np.sort(grids, axis=2) == numbers).all(axis=(1, 2)) & \
+        (np.sort(grids, axis=1) == numbers[:, None]).all(axis=(1, 2)) & \
+        (np.sort(boxes, axis=2) == numbers).all(axis=(1, 2))
+    if puzzles is not None:
+        puzzles = np.asarray(puzzles).reshape(grids.shape)
+        valid &= ((puzzles == 0) | (puzzles == grids)).all(axis=(1, 2))
+    return bool(valid[0]) if single else valid
+
+
+def check_grid(grid: Union[np.ndarray, Sequence], puzzle: Optional[Union[np.ndarray, Sequence]] = None) -> bool:
+    """ Verifies one grid, see check_grids.
+
+    Args:
+        grid (Union[np.ndarray, Sequence]): The rows of the grid.
+        puzzle (Optional[Union[np.ndarray, Sequence]], optional): The rows of its puzzle. Defaults to None.
+
+    Returns:
+        bool: True if the grid is a valid solution of the puzzle, else False.
+    """
+    return check_grids(np.asarray(grid), None if puzzle is None else np.asarray(puzzle))
+
+
+def grid_to_line(grid: np.ndarray) -> str:
+    """ Writes a grid as one line, in the puzzle format read by SAT.parse_sudoku.
+        Boards up to 35x35 use one character per cell (letters from 'A' for 10), larger ones comma-separated numbers.
+
+    Args:
+        grid (np.ndarray): The (N, N) grid, with 0 for empty cells.
+
+    Returns:
+        str: The line, with '.' for empty cells.
+    """
+    values = np.asarray(grid).ravel().tolist()
+    if len(grid) > 35:
+        return ",".join(str(value) if value else "." for value in values)
+    return "".join("." if not value else str(value) if value < 10 else chr(ord('A') + value - 10) for value in values)
+
+
+def grid_to_json(grid: np.ndarray) -> str:
+    """ Writes a grid as a JSON object with its size and rows.
+
+    Args:
+        grid (np.ndarray): The (N, N) grid.
+
+    Returns:
+        str: The JSON text.
+    """
+    return json.dumps({"size": len(grid), "grid": np.asarray(grid).tolist()})
+
+
+def grid_to_bytes(grid: np.ndarray) -> bytes:
+    """ Writes a grid compactly: a 16-bit little-endian size, then one byte per cell (two for boards above 255).
+
+    Args:
+        grid (np.ndarray): The (N, N) grid.
+
+    Returns:
+        bytes: The encoded grid.
+    """
+    n = len(grid)
+    dtype = '<u1' if n < 256 else '<u2'
+    return n.to_bytes(2, 'little') + np.asarray(grid, dtype=dtype).tobytes()
+
+
+def grid_from_bytes(data: bytes) -> np.ndarray:
+    """ Reads a grid written by grid_to_bytes.
+
+    Args:
+        data (bytes): The encoded grid.
+
+    Returns:
+        np.ndarray: The (N, N) grid.
+    """
+    n = int.from_bytes(data[:2], 'little')
+    dtype = '<u1' if n < 256 else '<u2'
+    return np.frombuffer(data, dtype=dtype, count=n * n, offset=2).astype(np.int64).reshape(n, n)
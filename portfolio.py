@@ -0,0 +1,69 @@
+import sys
+from multiprocessing import Process, Queue
+from queue import Empty
+from time import time
+from typing import Dict, Optional, Sequence, Tuple, Union
+
+from solver import DPLL, ClauseStore, HEURISTICS
+
+
+def race_worker(path: Union[str, ClauseStore], heuristic: str, results: Queue, max_time: Optional[float]) -> None:
+    """ Solves a problem with one heuristic and reports the outcome to the portfolio.
+
+    Args:
+        path (Union[str, ClauseStore]): The path to the .cnf file which must be solved, or its clauses.
+        heuristic (str): The number of the heuristic to use.
+        results (Queue): The queue the outcome is put on.
+        max_time (Optional[float]): The number of seconds after which the solver gives up.
+    """
+    dpll = DPLL()
+    result = dpll.find_solution(path, heuristic, max_time=max_time)
+    results.put((heuristic, result, dpll.solution, dpll.split_counter))
+
+
+def solve_portfolio(path: Union[str, ClauseStore], heuristics: Sequence[str] = HEURISTICS,
+                    max_time: Optional[float] = None) -> Tuple[Optional[bool], Optional[Dict], Optional[str], int]:
+    """ Races several heuristics on one problem, one process each, and keeps the first answer.
+        The other processes are terminated as soon as one of them finds out whether the problem is satisfiable.
+
+    Args:
+        path (Union[str, ClauseStore]): The path to the .cnf file which must be solved, or its clauses.
+        heuristics (Sequence[str], optional): The numbers of the heuristics to race. Defaults to every heuristic.
+        max_time (Optional[float], optional): The number of seconds after which the portfolio gives up. Defaults to None.
+
+    Returns:
+        Tuple[Optional[bool], Optional[Dict], Optional[str], int]: Whether a solution was found (None if every
+            heuristic ran out of time), the solution, the winning heuristic and its number of splits.
+    """
+    deadline = time() + max_time if max_time is not None else None
+    results = Queue()
+    workers = [Process(target=race_worker, args=(path, heuristic, results, max_time), daemon=True) for heuristic in heuristics]
+    for worker in workers:
+        worker.start()
+    try:
+        pending = len(workers)
+        while pending and (deadline is None or time() < deadline):
+            try:
+                heuristic, result, solution, splits = results.get(timeout=0.1)
+            except Empty:
+                # Stop waiting if every worker died without reporting
+                if not any(worker.is_alive() for worker in workers) and results.empty():
+                    break
+                continue
+            pending -= 1
+            # A heuristic that ran out of time says nothing, so keep waiting for the others
+            if result is not None:
+                return result, solution, heuristic, splits
+        return None, None, None, 0
+    finally:
+        for worker in workers:
+            if worker.is_alive():
+                worker.terminate()
+            worker.join()
+
+
+if __name__ == "__main__":
+    result, solution, heuristic, splits = solve_portfolio(sys.argv[1])
+    print("SAT" if result else "UNSAT" if result is False else "UNKNOWN", "heuristic", heuristic, "splits", splits)
+
+    #example: python3 portfolio.py sudoku/sudoku2.cnf
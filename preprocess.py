@@ -0,0 +1,146 @@
+import math
+from typing import List, Optional, Tuple
+
+from SAT import cell_var
+from solver import ClauseStore
+
+# Units and peers of every board size seen so far
+grid_cache = {}
+
+
+def grid_units(n: int) -> Tuple[List, List]:
+    """ Computes the units (rows, columns and boxes) and the peers of every cell of an n x n board.
+        Cells are numbered row by row from 0.
+
+    Args:
+        n (int): The dimension of the board.
+
+    Returns:
+        Tuple[List, List]: The cells of every unit, and the peers of every cell.
+    """
+    if n not in grid_cache:
+        block = int(math.sqrt(n))
+        units = [[i * n + j for j in range(n)] for i in range(n)]
+        units += [[i * n + j for i in range(n)] for j in range(n)]
+        units += [[(block * a + k) * n + block * b + l for k in range(block) for l in range(block)]
+                  for a in range(block) for b in range(block)]
+        peers = [set() for _ in range(n * n)]
+        for unit in units:
+            for cell in unit:
+                peers[cell].update(unit)
+        for cell, others in enumerate(peers):
+            others.discard(cell)
+        grid_cache[n] = (units, [sorted(others) for others in peers])
+    return grid_cache[n]
+
+
+def reduce_grid(sudoku_in: List) -> Optional[List]:
+    """ Eliminates candidates at the grid level, before any clause is built.
+        Removes the numbers of given and solved cells from their peers, and applies
+        naked singles (a cell with one candidate left) and hidden singles (a number
+        with one possible cell left in a unit) until neither changes anything.
+
+    Args:
+        sudoku_in (List): The rows of the Sudoku, with 0 for empty cells.
+
+    Returns:
+        Optional[List]: The candidate bitmask of every cell (bit v - 1 for number v), or None on a contradiction.
+    """
+    n = len(sudoku_in[0])
+    units, peers = grid_units(n)
+    candidates = [(1 << n) - 1] * (n * n)
+    solved = [False] * (n * n)
+    # The (cell, number - 1) placements still to be made
+    pending = [(i * n + j, row[j] - 1) for i, row in enumerate(sudoku_in) for j in range(n) if row[j] != 0]
+
+    def settle() -> bool:
+        """ Makes the pending placements and eliminates their numbers from the peers (naked singles).
+
+        Returns:
+            bool: False if a contradiction was found, else True.
+        """
+        while pending:
+            cell, value = pending.pop()
+            bit = 1 << value
+            if not candidates[cell] & bit:
+                return False
+            if solved[cell]:
+                continue
+            solved[cell] = True
+            candidates[cell] = bit
+            for peer in peers[cell]:
+                if candidates[peer] & bit:
+                    candidates[peer] &= ~bit
+                    if not candidates[peer]:
+                        return False
+                    # A single candidate left is a naked single
+                    if not candidates[peer] & (candidates[peer] - 1):
+                        pending.append((peer, candidates[peer].bit_length() - 1))
+        return True
+
+    while True:
+        if not settle():
+            return None
+        # Look for hidden singles
+        for unit in units:
+            for value in range(n):
+                bit = 1 << value
+                cells = [cell for cell in unit if candidates[cell] & bit]
+                if not cells:
+                    return None
+                if len(cells) == 1 and not solved[cells[0]]:
+                    pending.append((cells[0], value))
+        if not pending:
+            return candidates
+
+
+def encode_residual(sudoku_in: List) -> ClauseStore:
+    """ Converts a Sudoku to the clauses that are left after grid-level preprocessing.
+
+    Args:
+        sudoku_in (List): The rows of the Sudoku, with 0 for empty cells.
+
+    Returns:
+        ClauseStore: The residual clauses, containing an empty clause if the Sudoku has no solution.
+    """
+    return encode_candidates(len(sudoku_in[0]), reduce_grid(sudoku_in))
+
+
+def encode_candidates(n: int, candidates: Optional[List]) -> ClauseStore:
+    """ Converts the candidates left in the cells of an n x n board to clauses.
+        Solved cells become unit clauses, and only the remaining candidates of the other
+        cells get variables and rule clauses. Variables are numbered as by SAT.cell_var.
+
+    Args:
+        n (int): The dimension of the board.
+        candidates (Optional[List]): The candidate bitmask of every cell, row by row, or None on a contradiction.
+
+    Returns:
+        ClauseStore: The residual clauses, containing an empty clause if there is no solution.
+    """
+    store = ClauseStore()
+    if candidates is None:
+        store.add(())
+        return store
+
+    def variable(cell: int, value: int) -> int:
+        return cell_var(n, cell // n + 1, cell % n + 1, value + 1)
+
+    values = [[value for value in range(n) if mask >> value & 1] for mask in candidates]
+    # Solved cells are fixed by a unit clause, the others hold at least one of their candidates
+    for cell in range(n * n):
+        store.add(tuple(variable(cell, value) for value in values[cell]))
+    # A number appears at most once per unit, among the unsolved cells that can still hold it
+    units, _ = grid_units(n)
+    pairs = set()
+    for unit in units:
+        open_cells = [cell for cell in unit if len(values[cell]) > 1]
+        for x, first in enumerate(open_cells):
+            for second in open_cells[x + 1:]:
+                shared = candidates[first] & candidates[second]
+                for value in range(n):
+                    if shared >> value & 1:
+                        pairs.add((min(first, second), max(first, second), value))
+    for first, second, value in sorted(pairs):
+        store.add((-variable(first, value), -variable(second, value)))
+    return store
@@ -0,0 +1,433 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from time import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import SAT
+import bitboard
+import decode
+
+# Longest request line in bytes, enough for a 64x64 board with comma-separated numbers
+LINE_LIMIT = 1 << 16
+
+
+def warm_worker(sizes: Sequence[int]) -> None:
+    """ Prepares a worker process before its first request, so that requests do not pay for imports and rule building.
+
+    Args:
+        sizes (Sequence[int]): The board dimensions whose rules are built in advance.
+    """
+    for n in sizes:
+        SAT.rule_clauses(n)
+        bitboard.box_index(n)
+
+
+def solve_lines(lines: List[str], option: str, deadlines: List[Optional[float]],
+                budget: float) -> List[Tuple[Optional[str], Optional[str], Optional[List[int]]]]:
+    """ Solves a micro-batch of puzzles in a worker process: propagation runs on all puzzles of the same size at once,
+        then the puzzles it does not resolve are searched until the batch has spent its search budget.
+        The puzzles left over are returned with their candidates, to be searched as their own jobs, so that a hard
+        puzzle holds back the answers of the rest of the batch by at most the budget.
+
+    Args:
+        lines (List[str]): The puzzles, one line each.
+        option (str): The number of the DPLL heuristic for puzzles that propagation does not resolve.
+        deadlines (List[Optional[float]]): The time.time() by which each puzzle must be answered, None for no deadline.
+        budget (float): The number of seconds the batch may spend searching.
+
+    Returns:
+        List[Tuple[Optional[str], Optional[str], Optional[List[int]]]]: The status of every puzzle (None if it still
+            needs a search), its solved grid as one line if it is 'SAT', and its candidates if it still needs a search.
+    """
+    sudokus = [SAT.parse_sudoku(line) for line in lines]
+    sizes = {}
+    for index, sudoku in enumerate(sudokus):
+        sizes.setdefault(len(sudoku), []).append(index)
+    results = [None] * len(lines)
+    unresolved = []
+    for indices in sizes.values():
+        candidates, grids, status = bitboard.propagate_grids([sudokus[index] for index in indices])
+        for index, remaining, grid, outcome in zip(indices, candidates, grids, status):
+            results[index] = (outcome, decode.grid_to_line(grid) if outcome == 'SAT' else None, None)
+            if outcome is None:
+                unresolved.append((index, remaining.tolist()))
+    closing = time() + budget
+    for index, remaining in unresolved:
+        deadline = deadlines[index]
+        # A search within the budget stops at the deadline of the puzzle or the end of the budget, whichever comes first
+        stop = closing if deadline is None else min(deadline, closing)
+        status, solution = search_line(remaining, option, stop) if stop > time() else ('UNKNOWN', None)
+        if status == 'UNKNOWN' and stop == closing:
+            results[index] = (None, None, remaining)
+        else:
+            results[index] = (status, solution, None)
+    return results
+
+
+def search_line(candidates: List[List[int]], option: str, deadline: Optional[float]) -> Tuple[str, Optional[str]]:
+    """ Searches one puzzle that propagation did not resolve, in a worker process.
+
+    Args:
+        candidates (List[List[int]]): The candidate bitmasks of its cells, row by row.
+        option (str): The number of the DPLL heuristic.
+        deadline (Optional[float]): The time.time() by which the puzzle must be answered, None for no deadline.
+
+    Returns:
+        Tuple[str, Optional[str]]: The status of the puzzle, and its solved grid as one line if it is 'SAT'.
+    """
+    status, grid = bitboard.search_candidates(candidates, option, deadline)
+    return status, decode.grid_to_line(grid) if grid is not None else None
+
+
+def check_puzzle(line: str) -> Optional[str]:
+    """ Verifies that a line is a well-formed puzzle, before it is sent to a worker.
+
+    Args:
+        line (str): The puzzle.
+
+    Returns:
+        Optional[str]: A description of the problem, or None if the puzzle is well-formed.
+    """
+    try:
+        sudoku = SAT.parse_sudoku(line)
+    except ValueError as e:
+        return str(e)
+    if len(sudoku) > bitboard.MAX_SIZE:
+        return f"boards larger than {bitboard.MAX_SIZE}x{bitboard.MAX_SIZE} are not supported"
+    return None
+
+
+class SolverService():
+    """Implements a local solving service: newline-delimited JSON over TCP or a Unix socket, answered by warm worker processes.
+    """
+    def __init__(self, processes: Optional[int] = None, option: str = '3', batch_size: int = 32, batch_window: float = 0.002,
+                 max_pending: int = 1024, deadline: Optional[float] = 10.0, sizes: Sequence[int] = (9,),
+                 search_budget: float = 0.01) -> None:
+        """ Initializes the service.
+
+        Args:
+            processes (Optional[int], optional): The number of worker processes. Defaults to the number of CPUs.
+            option (str, optional): The number of the DPLL heuristic. Defaults to '3'.
+            batch_size (int, optional): The largest number of requests sent to a worker at once. Defaults to 32.
+            batch_window (float, optional): The number of seconds a batch waits for more requests. Defaults to 0.002.
+            max_pending (int, optional): The number of requests that may wait for a worker before reading
+                from the clients stops. Defaults to 1024.
+            deadline (Optional[float], optional): The number of seconds a request may take unless it asks for
+                another deadline, None for no deadline. Defaults to 10.0.
+            sizes (Sequence[int], optional): The board dimensions the workers prepare for. Defaults to (9,).
+            search_budget (float, optional): The number of seconds a batch may spend searching the puzzles that
+                propagation does not resolve, before the rest are searched as their own jobs. Defaults to 0.01.
+        """
+        # The worker processes, warmed by their initializer when start() launches them
+        self.processes = processes or os.cpu_count()
+        self.pool = ProcessPoolExecutor(self.processes, initializer=warm_worker, initargs=(tuple(sizes),))
+        self.option = option
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.deadline = deadline
+        self.search_budget = search_budget
+        # Requests waiting for a worker, as (line, deadline, future) entries; a full queue stops reading from the clients
+        self.pending = asyncio.Queue(max_pending)
+        # Bounds the batches being solved, so that requests wait in the queue rather than in the pool
+        self.in_flight = asyncio.Semaphore(self.processes * 2)
+        self.batcher = None
+
+    async def start(self, port: Optional[int] = None, host: str = "127.0.0.1", path: Optional[str] = None) -> asyncio.AbstractServer:
+        """ Starts the worker processes and, once they are warm, starts listening, on a Unix socket
+            if a path is given, else on a TCP port.
+
+        Args:
+            port (Optional[int], optional): The TCP port. Defaults to None.
+            host (str, optional): The TCP host. Defaults to "127.0.0.1".
+            path (Optional[str], optional): The path of the Unix socket. Defaults to None.
+
+        Returns:
+            asyncio.AbstractServer: The server.
+        """
+        # The pool only starts its processes on demand, so start all of them now and wait until they are warm
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, warm_worker, ()) for _ in range(self.processes)))
+        self.batcher = asyncio.create_task(self.run_batches())
+        if path:
+            return await asyncio.start_unix_server(self.handle, path=path, limit=LINE_LIMIT)
+        return await asyncio.start_server(self.handle, host, port, limit=LINE_LIMIT)
+
+    def close(self) -> None:
+        """ Stops the batches and the worker processes.
+        """
+        if self.batcher:
+            self.batcher.cancel()
+        self.pool.shutdown(cancel_futures=True)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """ Serves one client: every line is a request, and every answer is written as soon as it is ready.
+            A request is a puzzle line, or a JSON object with a "puzzle", and optionally an "id" and a
+            "deadline" in seconds. An answer is a JSON object with the "id", the "status", the "solution"
+            (the solved grid as one line) and the "time" taken in seconds.
+
+        Args:
+            reader (asyncio.StreamReader): The requests of the client.
+            writer (asyncio.StreamWriter): The answers to the client.
+        """
+        answers = asyncio.Queue()
+        sender = asyncio.create_task(self.send(answers, writer))
+        waiting = set()
+        number = 0
+        try:
+            while (raw := await self.read_line(reader)) != b'':
+                # Blank lines are skipped, only the end of the stream ends the connection
+                if raw is not None and not raw.strip():
+                    continue
+                number += 1
+                start = time()
+                request = None
+                try:
+                    if raw is None:
+                        raise ValueError(f"the line is longer than {LINE_LIMIT} bytes")
+                    line = raw.decode().strip()
+                    request = json.loads(line) if line.startswith('{') else {"puzzle": line}
+                    request.setdefault("id", number)
+                    puzzle = request["puzzle"]
+                    seconds = request.get("deadline", self.deadline)
+                    if seconds is not None and (isinstance(seconds, bool) or not isinstance(seconds, (int, float))
+                                                or not seconds >= 0 or math.isinf(seconds)):
+                        raise ValueError(f"deadline must be a non-negative number of seconds, not {seconds!r}")
+                    error = check_puzzle(puzzle)
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    request, error = {"id": request.get("id", number) if isinstance(request, dict) else number}, \
+                        f"malformed request: {e}"
+                if error:
+                    answers.put_nowait({"id": request["id"], "status": "ERROR", "error": error})
+                    continue
+                future = asyncio.get_running_loop().create_future()
+                # Waits here while the queue is full, which stops reading from this client
+                await self.pending.put((puzzle, start + seconds if seconds is not None else None, future))
+                task = asyncio.create_task(self.answer(request["id"], start, future, answers))
+                waiting.add(task)
+                task.add_done_callback(waiting.discard)
+        except ConnectionError:
+            pass
+        finally:
+            # The requests read so far are still answered, whatever ended the connection
+            await asyncio.gather(*waiting, return_exceptions=True)
+            answers.put_nowait(None)
+            await sender
+
+    async def read_line(self, reader: asyncio.StreamReader) -> Optional[bytes]:
+        """ Reads one request line, skipping over a line longer than the limit of the reader.
+
+        Args:
+            reader (asyncio.StreamReader): The requests of the client.
+
+        Returns:
+            Optional[bytes]: The line, b'' at the end of the stream, or None if the line was too long.
+        """
+        try:
+            return await reader.readuntil(b'\n')
+        except asyncio.IncompleteReadError as e:
+            # The last line may lack its newline
+            return e.partial
+        except asyncio.LimitOverrunError as e:
+            overrun = e
+        # Drop the long line up to and including its newline, the rest of the stream is read as usual
+        while True:
+            try:
+                await reader.readexactly(overrun.consumed)
+                await reader.readuntil(b'\n')
+                return None
+            except asyncio.IncompleteReadError:
+                return None
+            except asyncio.LimitOverrunError as e:
+                overrun = e
+
+    async def answer(self, identifier, start: float, future: asyncio.Future, answers: asyncio.Queue) -> None:
+        """ Waits for the outcome of one request and queues its answer.
+
+        Args:
+            identifier: The id of the request.
+            start (float): The time the request was read.
+            future (asyncio.Future): The outcome of the request.
+            answers (asyncio.Queue): The answers of the client.
+        """
+        try:
+            status, solution = await future
+            answers.put_nowait({"id": identifier, "status": status, "solution": solution, "time": time() - start})
+        except Exception as e:
+            answers.put_nowait({"id": identifier, "status": "ERROR", "error": str(e)})
+
+    async def send(self, answers: asyncio.Queue, writer: asyncio.StreamWriter) -> None:
+        """ Writes the answers of one client in the order they are ready, until a None answer.
+
+        Args:
+            answers (asyncio.Queue): The answers of the client.
+            writer (asyncio.StreamWriter): The connection to the client.
+        """
+        try:
+            while (answer := await answers.get()) is not None:
+                writer.write((json.dumps(answer) + "\n").encode())
+                # Waits while the client is not reading its answers
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def run_batches(self) -> None:
+        """ Groups the pending requests into micro-batches and sends every batch to a worker.
+            A batch is sent once it is full or its window has passed since its first request.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.pending.get()]
+            closing = loop.time() + self.batch_window
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(await asyncio.wait_for(self.pending.get(), closing - loop.time()))
+                except asyncio.TimeoutError:
+                    break
+            # Requests whose deadline already passed are answered without a worker
+            now = time()
+            expired = [entry for entry in batch if entry[1] is not None and entry[1] <= now]
+            for _, _, future in expired:
+                if not future.done():
+                    future.set_result(('UNKNOWN', None))
+            batch = [entry for entry in batch if entry not in expired]
+            if batch:
+                await self.in_flight.acquire()
+                asyncio.create_task(self.dispatch(batch))
+
+    async def dispatch(self, batch: List[Tuple[str, Optional[float], asyncio.Future]]) -> None:
+        """ Solves one micro-batch in a worker process and settles the futures of the requests it resolves.
+            Every request left over by the search budget of the batch is sent to the workers as its own job.
+
+        Args:
+            batch (List[Tuple[str, Optional[float], asyncio.Future]]): The requests of the batch.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            lines, deadlines, futures = zip(*batch)
+            results = await loop.run_in_executor(self.pool, solve_lines, list(lines), self.option, list(deadlines),
+                                                 self.search_budget)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self.in_flight.release()
+        for future, deadline, (status, solution, candidates) in zip(futures, deadlines, results):
+            if status is None:
+                asyncio.create_task(self.search(candidates, deadline, future))
+            elif not future.done():
+                future.set_result((status, solution))
+
+    async def search(self, candidates: List[List[int]], deadline: Optional[float], future: asyncio.Future) -> None:
+        """ Searches one request that propagation did not resolve in a worker process and settles its future.
+
+        Args:
+            candidates (List[List[int]]): The candidate bitmasks of its cells, row by row.
+            deadline (Optional[float]): The time.time() by which the request must be answered, None for no deadline.
+            future (asyncio.Future): The outcome of the request.
+        """
+        # Searches count against the same bound as batches, so that they wait here rather than in the pool
+        async with self.in_flight:
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(self.pool, search_line, candidates, self.option, deadline)
+                if not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+
+
+async def load_test(lines: List[str], clients: int = 8, port: Optional[int] = None, host: str = "127.0.0.1",
+                    path: Optional[str] = None) -> Dict[str, float]:
+    """ Sends puzzles to a running service from concurrent clients, one request at a time per client,
+        and measures the latency of every request.
+
+    Args:
+        lines (List[str]): The puzzles, spread over the clients in turn.
+        clients (int, optional): The number of concurrent connections. Defaults to 8.
+        port (Optional[int], optional): The TCP port of the service. Defaults to None.
+        host (str, optional): The TCP host of the service. Defaults to "127.0.0.1".
+        path (Optional[str], optional): The path of the Unix socket of the service. Defaults to None.
+
+    Returns:
+        Dict[str, float]: The number of requests, the throughput per second and the p50, p99 and max latency in milliseconds.
+    """
+    latencies = []
+
+    async def client(share: List[str]) -> None:
+        if path:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        # Every client waits for its answer before sending the next puzzle
+        for line in share:
+            sent = time()
+            writer.write((line + "\n").encode())
+            await writer.drain()
+            await reader.readline()
+            latencies.append((time() - sent) * 1000)
+        writer.close()
+    start = time()
+    await asyncio.gather(*(client(lines[index::clients]) for index in range(clients)))
+    elapsed = time() - start
+    latencies.sort()
+    return {"requests": len(latencies), "throughput": len(latencies) / elapsed,
+            "p50_ms": latencies[len(latencies) // 2], "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+            "max_ms": latencies[-1]}
+
+
+async def serve(service: SolverService, port: Optional[int] = None, path: Optional[str] = None) -> None:
+    """ Runs a service until it is interrupted.
+
+    Args:
+        service (SolverService): The service.
+        port (Optional[int], optional): The TCP port. Defaults to None.
+        path (Optional[str], optional): The path of the Unix socket. Defaults to None.
+    """
+    server = await service.start(port=port, path=path)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve puzzle solving over newline-delimited JSON.")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port to listen on")
+    parser.add_argument("--unix", help="path of a Unix socket to listen on instead of TCP")
+    parser.add_argument("-H", "--heuristic", default="3", help="DPLL heuristic number")
+    parser.add_argument("-p", "--processes", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--batch-size", type=int, default=32, help="largest number of requests sent to a worker at once")
+    parser.add_argument("--batch-window", type=float, default=2.0, help="milliseconds a batch waits for more requests")
+    parser.add_argument("--max-pending", type=int, default=1024, help="requests waiting for a worker before reading stops")
+    parser.add_argument("--deadline", type=float, default=10.0, help="default seconds per request")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[9], help="board dimensions the workers prepare for")
+    parser.add_argument("--search-budget", type=float, default=10.0,
+                        help="milliseconds a batch may spend searching before the rest are searched as their own jobs")
+    parser.add_argument("--load", metavar="FILE", help="measure the latency of a running service with the puzzles of a file")
+    parser.add_argument("-c", "--clients", type=int, default=8, help="concurrent connections of the load test")
+    args = parser.parse_args()
+
+    async def main() -> None:
+        if args.load:
+            with open(args.load, "r") as f:
+                lines = [line.strip() for line in f if line.strip()]
+            stats = await load_test(lines, args.clients, args.port, path=args.unix)
+            print(f"{stats['requests']} requests, {stats['throughput']:.1f}/s, p50 {stats['p50_ms']:.1f} ms, "
+                  f"p99 {stats['p99_ms']:.1f} ms, max {stats['max_ms']:.1f} ms")
+            return
+        service = SolverService(args.processes, args.heuristic, args.batch_size, args.batch_window / 1000,
+                                args.max_pending, args.deadline, args.sizes, args.search_budget / 1000)
+        await serve(service, args.port, args.unix)
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -1,292 +1,1264 @@
-import copy
-from typing import List, Dict
-
-def format(string: str) -> str:
-    try:
-        if string[0] == ' ':
-            return string[1:]
-        elif string[-1] == ' ':
-            return string[:-1]
+import heapq
+import mmap
+import struct
+import sys
+from array import array
+from time import perf_counter, time
+from typing import Callable, List, Dict, Iterable, Optional, Tuple, Union
+
+# The heuristic numbers supported by DPLL.find_solution: basic, Jeroslow-Wang, VSIDS and CDCL
+HEURISTICS = ('0', '1', '2', '3')
+# The restart strategies supported by DPLL.find_solution
+RESTARTS = ('none', 'luby', 'geometric')
+# Magic bytes and version of the binary clause format, followed by the number of variables and clauses
+CNFB_MAGIC = b'CNFB'
+CNFB_HEADER = struct.Struct('<4siii')
+
+
+def count_solutions(path: Union[str, 'ClauseStore'], option: str = '3', limit: int = 2, **options) -> Optional[int]:
+    """ Counts the solutions of a problem, up to a limit. A limit of 2 tells whether a Sudoku has a unique solution.
+
+    Args:
+        path (Union[str, ClauseStore]): The path to the .cnf or .cnfb file, or its clauses.
+        option (str, optional): The number of the heuristic. Defaults to '3'.
+        limit (int, optional): The number of solutions after which counting stops. Defaults to 2.
+        **options: Further options of DPLL.find_solution, such as max_time.
+
+    Returns:
+        Optional[int]: The number of solutions, at most the limit, or None if a budget ran out first.
+    """
+    dpll = DPLL()
+    dpll.find_solution(path, option, max_solutions=limit, **options)
+    return None if dpll.status == 'UNKNOWN' else dpll.solution_count
+
+
+def luby(i: int) -> int:
+    """ Computes the i-th element of the Luby sequence (1, 1, 2, 1, 1, 2, 4, 1, ...).
+
+    Args:
+        i (int): The position in the sequence, starting at 1.
+
+    Returns:
+        int: The element of the sequence.
+    """
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    while (1 << k) - 1 != i:
+        i -= (1 << (k - 1)) - 1
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+    return 1 << (k - 1)
+
+
+class ClauseStore():
+    """Implements an integer-literal clause database.
+    """
+    def __init__(self, clauses: Iterable[Iterable[int]] = ()) -> None:
+        """ Initializes a clause store.
+
+        Args:
+            clauses (Iterable[Iterable[int]], optional): The initial clauses, as signed integer literals. Defaults to ().
+        """
+        # Every clause, stored as a compact array of signed integer literals
+        self.clauses = []
+        # Maps each literal to the indices of the clauses it occurs in, None until it is first needed
+        self._occurrences = {}
+        # The variables in order of their first occurence
+        self.variables = {}
+        for clause in clauses:
+            self.add(clause)
+
+    def __len__(self) -> int:
+        return len(self.clauses)
+
+    @property
+    def occurrences(self) -> Dict[int, List[int]]:
+        """ Maps each literal to the indices of the clauses it occurs in. Stores loaded from a .cnfb file
+            build it on first use, as clause learning never needs it.
+
+        Returns:
+            Dict[int, List[int]]: The occurrences of every literal.
+        """
+        if self._occurrences is None:
+            occurrences = self._occurrences = {}
+            for index, clause in enumerate(self.clauses):
+                for literal in clause:
+                    occurrences.setdefault(literal, []).append(index)
+        return self._occurrences
+
+    def add(self, clause: Iterable[int]) -> int:
+        """ Adds a clause to the store and indexes its literals.
+
+        Args:
+            clause (Iterable[int]): The literals of the clause.
+
+        Returns:
+            int: The index of the new clause.
+        """
+        index = len(self.clauses)
+        # Drop repeated literals so that every occurence is indexed once
+        literals = array('i', dict.fromkeys(clause))
+        self.clauses.append(literals)
+        for literal in literals:
+            # An index that is not built yet will include this clause when it is
+            if self._occurrences is not None:
+                self._occurrences.setdefault(literal, []).append(index)
+            self.variables.setdefault(abs(literal), None)
+        return index
+
+    def copy(self) -> 'ClauseStore':
+        """ Copies the store so that clauses can be added without changing the original.
+            The clause arrays themselves are shared, as they are never modified.
+
+        Returns:
+            ClauseStore: The copy of the store.
+        """
+        store = ClauseStore()
+        store.clauses = list(self.clauses)
+        if self._occurrences is not None:
+            store._occurrences = {literal: list(indices) for literal, indices in self._occurrences.items()}
         else:
-            new = []
-            prev = None
-            for c in string:
-                if not (prev == ' ' and c == ' '):
-                    new.append(c)
-                prev = c
-            return "".join(new)
-    except:
-        return string
-                
+            store._occurrences = None
+        store.variables = dict(self.variables)
+        return store
+
+    @classmethod
+    def from_dimacs(cls, path: str) -> 'ClauseStore':
+        """ Loads a clause store from a .cnf file in DIMACS format, one line at a time.
+            Comment lines and the header are skipped, and a clause may span several lines until its terminating 0.
+
+        Args:
+            path (str): The path to the .cnf file.
+
+        Returns:
+            ClauseStore: The clauses of the file.
+        """
+        store = cls()
+        pending = []
+        with open(path, 'r') as f:
+            for line in f:
+                tokens = line.split()
+                if not tokens or tokens[0] in ('c', 'p'):
+                    continue
+                # Some benchmark files end with a '%' line
+                if tokens[0] == '%':
+                    break
+                # Most lines hold exactly one clause
+                if not pending and tokens[-1] == '0' and '0' not in tokens[:-1]:
+                    store.add(map(int, tokens[:-1]))
+                    continue
+                for literal in map(int, tokens):
+                    if literal == 0:
+                        store.add(pending)
+                        pending = []
+                    else:
+                        pending.append(literal)
+        if pending:
+            store.add(pending)
+        return store
+
+    @classmethod
+    def from_cnfb(cls, path: str) -> 'ClauseStore':
+        """ Loads a clause store from a binary .cnfb file written by to_cnfb.
+            The file is memory-mapped and the clauses are views into it, so the literals are not copied,
+            and the occurrences of the literals are only indexed when first needed.
+
+        Args:
+            path (str): The path to the .cnfb file.
+
+        Returns:
+            ClauseStore: The clauses of the file.
+        """
+        with open(path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, num_clauses = CNFB_HEADER.unpack_from(data)
+        if magic != CNFB_MAGIC or version != 1:
+            raise ValueError(f"{path} is not a version 1 .cnfb file")
+        words = memoryview(data)[CNFB_HEADER.size:].cast('i')
+        if sys.byteorder != 'little':
+            # Big-endian machines work on a swapped copy instead
+            swapped = array('i', words)
+            swapped.byteswap()
+            words = memoryview(swapped)
+        offsets, literals = words[:num_clauses + 1], words[num_clauses + 1:]
+        store = cls()
+        store.clauses = [literals[offsets[index]:offsets[index + 1]] for index in range(num_clauses)]
+        store._occurrences = None
+        store.variables = dict.fromkeys(map(abs, literals))
+        return store
+
+    @classmethod
+    def load(cls, path: str) -> 'ClauseStore':
+        """ Loads a clause store from a .cnfb file, or from a DIMACS file for any other extension.
+
+        Args:
+            path (str): The path to the file.
+
+        Returns:
+            ClauseStore: The clauses of the file.
+        """
+        return cls.from_cnfb(path) if path.endswith('.cnfb') else cls.from_dimacs(path)
+
+    def to_dimacs(self, path: str) -> None:
+        """ Writes the clauses to a .cnf file in DIMACS format.
+
+        Args:
+            path (str): The path to the .cnf file.
+        """
+        with open(path, 'w') as f:
+            f.write(f"p cnf {max(self.variables, default=0)} {len(self.clauses)}\n")
+            f.writelines(" ".join(map(str, clause)) + " 0\n" for clause in self.clauses)
+
+    def to_cnfb(self, path: str) -> None:
+        """ Writes the clauses to a binary .cnfb file: a header, the offset of every clause
+            and then all literals, as little-endian 32-bit integers.
+
+        Args:
+            path (str): The path to the .cnfb file.
+        """
+        offsets = array('i', [0])
+        literals = array('i')
+        for clause in self.clauses:
+            literals.extend(clause)
+            offsets.append(len(literals))
+        if sys.byteorder != 'little':
+            offsets.byteswap()
+            literals.byteswap()
+        with open(path, 'wb') as f:
+            f.write(CNFB_HEADER.pack(CNFB_MAGIC, 1, max(self.variables, default=0), len(self.clauses)))
+            offsets.tofile(f)
+            literals.tofile(f)
+
+
+class VarHeap():
+    """Implements an indexed binary max-heap of variables, ordered by their activity.
+    """
+    def __init__(self, activity: Dict[int, float], variables: Iterable[int] = ()) -> None:
+        """ Initializes a variable heap.
+
+        Args:
+            activity (Dict[int, float]): The activity of every variable, shared with the solver.
+            variables (Iterable[int], optional): The initial variables. Defaults to ().
+        """
+        self.activity = activity
+        # The variables, in heap order
+        self.heap = []
+        # Maps each variable in the heap to its position
+        self.position = {}
+        for variable in variables:
+            self.push(variable)
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def __contains__(self, variable: int) -> bool:
+        return variable in self.position
+
+    def push(self, variable: int) -> None:
+        """ Inserts a variable, unless it is in the heap already.
+
+        Args:
+            variable (int): The specified variable.
+        """
+        if variable not in self.position:
+            self.position[variable] = len(self.heap)
+            self.heap.append(variable)
+            self.sift_up(len(self.heap) - 1)
+
+    def increased(self, variable: int) -> None:
+        """ Restores the heap order after the activity of a variable went up.
+
+        Args:
+            variable (int): The specified variable.
+        """
+        if variable in self.position:
+            self.sift_up(self.position[variable])
+
+    def pop(self) -> int:
+        """ Removes the variable with the highest activity.
+
+        Returns:
+            int: The variable with the highest activity.
+        """
+        top = self.heap[0]
+        last = self.heap.pop()
+        del self.position[top]
+        if self.heap:
+            self.heap[0] = last
+            self.position[last] = 0
+            self.sift_down(0)
+        return top
+
+    def sift_up(self, i: int) -> None:
+        heap, position, activity = self.heap, self.position, self.activity
+        variable = heap[i]
+        while i > 0:
+            parent = (i - 1) >> 1
+            if activity[heap[parent]] >= activity[variable]:
+                break
+            heap[i] = heap[parent]
+            position[heap[i]] = i
+            i = parent
+        heap[i] = variable
+        position[variable] = i
+
+    def sift_down(self, i: int) -> None:
+        heap, position, activity = self.heap, self.position, self.activity
+        variable = heap[i]
+        size = len(heap)
+        while 2 * i + 1 < size:
+            child = 2 * i + 1
+            if child + 1 < size and activity[heap[child + 1]] > activity[heap[child]]:
+                child += 1
+            if activity[heap[child]] <= activity[variable]:
+                break
+            heap[i] = heap[child]
+            position[heap[i]] = i
+            i = child
+        heap[i] = variable
+        position[variable] = i
+
+
 class DPLL():
     """Implements the DPLL solver class.
     """
-    def __init__(self) -> None:
+    def __init__(self, on_decision: Optional[Callable[[int, int], None]] = None,
+                 on_conflict: Optional[Callable[[List, int], None]] = None,
+                 on_solution: Optional[Callable[[Dict], None]] = None) -> None:
         """ Initializes a DPLL solver.
+
+        Args:
+            on_decision (Optional[Callable[[int, int], None]], optional): Called with the decision literal and its
+                decision level on every split. Defaults to None.
+            on_conflict (Optional[Callable[[List, int], None]], optional): Called with the conflicting clause and the
+                decision level on every conflict. Defaults to None.
+            on_solution (Optional[Callable[[Dict], None]], optional): Called with the solution once it is found. Defaults to None.
         """
-        # Whether the algorithm has constructed the list of unassigned variables yet
-        self.start = True
+        # The clause store of the problem being solved
+        self.store = None
+        # The clauses, reordered so that their two watched literals come first
+        self.clauses = []
+        # Maps each literal to the indices of the clauses watching it
+        self.watches = {}
+        # Maps each assigned literal to its truth value (both polarities are stored)
+        self.values = {}
+        # The assigned literals in order of assignment
+        self.trail = []
+        # The position in the trail of the next literal to propagate
+        self.qhead = 0
+        # The trail positions at which each decision level starts
+        self.trail_lim = []
+        # Whether the decision of each level has had its opposite value tried already
+        self.flipped = []
+        # Maps each assigned variable to the decision level it was assigned on
+        self.level = {}
+        # Maps each assigned variable to the index of the clause that implied it (None for decisions)
+        self.reason = {}
+        # The remaining unassigned variables, in insertion order
+        self.remaining = {}
         # The solution that the algorithm found
         self.solution = None
         # Chosen heuristic
         self.chosen_h = 0
         # Counts the number of splits
         self.split_counter = 0
-        # Counts variable occurences
-        self.var_counter = {}
-        # Whether the initial occurences counts are made yet
-        self.exists_var_counter = False
+        # Counts the number of conflicts
+        self.conflict_counter = 0
+        # Activity of every variable (VSIDS and CDCL)
+        self.activity = {}
+        # The amount added to a variable's activity when it takes part in a conflict
+        self.var_inc = 1.0
+        # The variables ordered by activity; assigned ones are dropped lazily when popped (VSIDS and CDCL)
+        self.order = None
+        # The indices of the learned clauses
+        self.learned = []
+        # Conflict-driven activity of every learned clause
+        self.clause_activity = {}
+        # The amount added to a learned clause's activity when it takes part in a conflict
+        self.clause_inc = 1.0
+        # Clause slots freed by learned clause deletion, to be reused
+        self.free_slots = []
+        # The number of learned clauses that triggers a reduction of the learned clause database
+        self.max_learned = 0
+        # Chosen restart strategy
+        self.restart = 'none'
+        # The number of conflicts of the first restart interval
+        self.restart_base = 100
+        # Counts the number of restarts
+        self.restart_counter = 0
+        # Counts the conflicts since the last restart
+        self.restart_conflicts = 0
+        # Whether decisions reuse the last value their variable had
+        self.phase_saving = False
+        # Maps each variable to the last value it was assigned
+        self.phase = {}
+        # The time after which the search gives up, if any
+        self.deadline = None
+        # The number of splits after which the search gives up, if any
+        self.max_splits = None
+        # The outcome of the last search: 'SAT', 'UNSAT' or 'UNKNOWN' if a budget ran out
+        self.status = None
+        # Whether the satisfied and unassigned literals of every clause are counted (all but CDCL)
+        self.tracking = False
+        # The number of true literals of every clause
+        self.true_count = []
+        # The number of unassigned literals of every clause
+        self.free_count = []
+        # The number of clauses without a true literal
+        self.unsat_count = 0
+        # Two-sided Jeroslow-Wang score of every variable, over the unsatisfied clauses
+        self.jw_score = {}
+        # Heap of (-score, variable) entries, at least as high as the current scores of the unassigned variables
+        self.jw_heap = []
+        # Deepest decision level where the pure literal rule is applied, None for every level
+        self.pure_depth = None
+        # Whether occurrence counts are kept for the pure literal rule
+        self.pure_tracking = False
+        # Number of unsatisfied clauses every literal occurs in
+        self.live_count = {}
+        # Variables that may have become pure since the last pure literal pass, in insertion order
+        self.pure_candidates = {}
+        # Number of assignments whose consequences were propagated
+        self.propagation_counter = 0
+        # Number of literals assigned by the pure literal rule
+        self.pure_counter = 0
+        # Number of backtracks and backjumps
+        self.backtrack_counter = 0
+        # Highest decision level reached
+        self.max_depth = 0
+        # Seconds spent in each hot method, only measured when timing is turned on
+        self.timings = dict.fromkeys(('unit_propagate', 'pure_literal', 'select_variable'), 0.0)
+        # Profile of the last solve, only kept when profiling is turned on
+        self.profile = None
+        # Number of solutions to find before stopping, and number found so far
+        self.max_solutions = 1
+        self.solution_count = 0
+        # Indices of the clauses that exclude solutions already counted by CDCL
+        self.blocking = []
+        # Whether the problem stays loaded for several calls of solve_assuming
+        self.incremental = False
+        # Whether the clauses themselves were found unsatisfiable
+        self.inconsistent = False
+        # Literals assumed true by the current call, decided before any other split and never flipped
+        self.assumptions = []
+        # Decision level at which every assumption holds, None until it was reached
+        self.assumption_level = None
+        # Next unused variable, for the selectors that switch off blocking clauses after an incremental call
+        self.next_selector = 0
+        # Callbacks on every split, conflict and solution
+        self.on_decision = on_decision
+        self.on_conflict = on_conflict
+        self.on_solution = on_solution
 
 
-    def find_solution(self, path: str, option: str) -> bool:
+    def find_solution(self, path: Union[str, ClauseStore], option: str, restart: str = 'none', phase_saving: bool = False,
+                      max_time: Optional[float] = None, max_splits: Optional[int] = None, pure_depth: Optional[int] = None,
+                      max_solutions: int = 1, timing: bool = False, profile: bool = False) -> Optional[bool]:
         """ Attempts to find a solution for a given SAT problem.
 
         Args:
-            path (str): The path to the .cnf file which must be solved.
-
+            path (Union[str, ClauseStore]): The path to the .cnf or .cnfb file which must be solved, or its clauses.
+            option (str): The number of the chosen heuristic.
+            restart (str, optional): The restart strategy, one of 'none', 'luby' or 'geometric'. Defaults to 'none'.
+            phase_saving (bool, optional): Whether decisions reuse the last value of their variable. Defaults to False.
+            max_time (Optional[float], optional): The number of seconds after which the search gives up. Defaults to None.
+            max_splits (Optional[int], optional): The number of splits after which the search gives up. Defaults to None.
+            pure_depth (Optional[int], optional): The deepest decision level where the pure literal rule is applied,
+                or a negative number to never apply it. Defaults to None, for every level.
+            max_solutions (int, optional): The number of solutions to find before stopping. Above 1, the search goes on after
+                each solution and self.solution_count counts them, while self.solution keeps the first one.
+                Only complete assignments count, and the pure literal rule is turned off. Defaults to 1.
+            timing (bool, optional): Whether to measure the time spent in propagation and variable selection. Defaults to False.
+            profile (bool, optional): Whether to run the solve under cProfile and keep the result in self.profile. Defaults to False.
 
         Returns:
-            bool: Returns True if a solution is found else False.
+            Optional[bool]: Returns True if a solution is found, False if there is none,
+                or None if a budget ran out first (the status is then 'UNKNOWN').
         """
-        self.path = path
-        # Open the .cnf file and load each line into a list
-        with open(path, 'r') as f:
-            lines = [line[:-3].rstrip() for line in f.readlines() if 'p' not in line]
-        
+        if option not in HEURISTICS:
+            raise ValueError(f"Unknown heuristic '{option}', expected one of {HEURISTICS}")
+        if restart not in RESTARTS:
+            raise ValueError(f"Unknown restart strategy '{restart}', expected one of {RESTARTS}")
+        if max_solutions > 1 and restart != 'none' and option != '3':
+            raise ValueError("Restarts would revisit solutions when counting without clause learning, use heuristic 3")
+        self.path = path if isinstance(path, str) else None
         self.chosen_h = int(option) # Chosen heuristic
-        # Begin solving the problem, we can ignore the initial first line.
-        return self.solve(lines, [], {}, False, None)
+        self.restart = restart
+        self.phase_saving = phase_saving
+        self.deadline = time() + max_time if max_time is not None else None
+        self.max_splits = max_splits
+        # Pure literals cut off solutions, so they are not used when counting
+        self.pure_depth = -1 if max_solutions > 1 else pure_depth
+        self.max_solutions = max_solutions
+        if timing:
+            self.time_methods()
+        profiler = None
+        if profile:
+            # Loaded only when profiling, pstats alone costs more than the rest of this module to import
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        # Load the .cnf or .cnfb file into an integer clause store, unless the clauses were given directly
+        if not self.load(ClauseStore.load(path) if isinstance(path, str) else path):
+            result = False
+        else:
+            result = self.solve()
+        if profiler:
+            profiler.disable()
+            import pstats
+            self.profile = pstats.Stats(profiler)
+        self.status = 'UNKNOWN' if result is None else 'SAT' if result else 'UNSAT'
+        return result
 
-    def solve(self, kb: List, remaining: List, assignments: Dict, split: bool, value: bool) -> bool:
-        """ Solves the .cnf file this solver was given.
+    def setup(self, path: Union[str, ClauseStore], option: str, restart: str = 'none', phase_saving: bool = False) -> bool:
+        """ Loads a problem once, to be solved many times under different assumptions with solve_assuming.
+            Learned clauses, activities and saved phases are kept from one call to the next.
 
         Args:
-            kb (List): The knowledge base (all of the clauses).
-            remaining (List): The remaining unassigned variables.
-            assignments (Dict): The assigned variables and their assigned values.
-            split (bool, optional): Whether this is a splitting instance or not. Defaults to False.
-            value (_type_, optional): The value of the assigned variable for this splitting instance. Defaults to None.
+            path (Union[str, ClauseStore]): The path to the .cnf or .cnfb file, or its clauses.
+            option (str): The number of the chosen heuristic.
+            restart (str, optional): The restart strategy, one of 'none', 'luby' or 'geometric'. Defaults to 'none'.
+            phase_saving (bool, optional): Whether decisions reuse the last value of their variable. Defaults to False.
 
         Returns:
-            bool: Whether a solution was found or not.
-        """
-        # Apply the split if this is a splitting instance
-        if split:
-            # New split
-            self.split_counter += 1
-            if self.chosen_h == 0:
-                variable = remaining.pop()
-            elif self.chosen_h == 1:
-                variable = self.two_jw(kb)
-                remaining.remove(variable)
-            elif self.chosen_h == 2:
-                variable = self.vsids(remaining, kb)
-                remaining.remove(variable)
-            assignments[variable] = value
-            if not value:
-                variable = '-'+variable if '-' not in variable else variable[1:]
-            anti = variable[1:] if '-' in variable else f'-{variable}'
-            kb = [c if anti not in c else format(c.replace(anti, '')) for c in kb if variable not in c or (anti in c and ('-' in anti or variable not in c))] 
-        # Apply the unit clause rule
-        kb, remaining, assignments = self.unit_propagate(kb, remaining, assignments)
-
-        # Apply the pure literal rule
-        kb, remaining, assignments = self.pure_literal(kb, remaining, assignments)
-        # Check whether the KB is empty
-        if self.kb_empty(kb):
-            print("SAT ", self.path)
-            self.solution = assignments
-            return True
-        # Check whether there are any empty clauses
-        if self.empty_clauses(kb):
-            return False
+            bool: False if the clauses are trivially unsatisfiable, else True.
+        """
+        if option not in HEURISTICS:
+            raise ValueError(f"Unknown heuristic '{option}', expected one of {HEURISTICS}")
+        if restart not in RESTARTS:
+            raise ValueError(f"Unknown restart strategy '{restart}', expected one of {RESTARTS}")
+        self.path = None
+        self.chosen_h = int(option)
+        self.restart = restart
+        self.phase_saving = phase_saving
+        self.incremental = True
+        store = ClauseStore.load(path) if isinstance(path, str) else path
+        self.next_selector = max(store.variables, default=0) + 1
+        self.inconsistent = not self.load(store)
+        return not self.inconsistent
+
+    def solve_assuming(self, assumptions: Iterable[int], max_time: Optional[float] = None, max_splits: Optional[int] = None,
+                       max_solutions: int = 1) -> Optional[bool]:
+        """ Solves the problem loaded by setup with some literals assumed true, such as the givens of a puzzle.
+            Only what the clauses imply is kept between calls, so every call can assume different literals.
+
+        Args:
+            assumptions (Iterable[int]): The literals assumed true for this call.
+            max_time (Optional[float], optional): The number of seconds after which the search gives up. Defaults to None.
+            max_splits (Optional[int], optional): The number of splits this call may take. Defaults to None.
+            max_solutions (int, optional): The number of solutions to find before stopping, see find_solution. Defaults to 1.
+
+        Returns:
+            Optional[bool]: True if a solution satisfies the assumptions, False if none does,
+                or None if a budget ran out first.
+        """
+        if max_solutions > 1 and self.restart != 'none' and self.chosen_h != 3:
+            raise ValueError("Restarts would revisit solutions when counting without clause learning, use heuristic 3")
+        self.assumptions = list(assumptions)
+        self.assumption_level = None
+        # Blocking clauses of CDCL only hold for this call, so they also need a selector assumed true
+        selector = self.new_selector() if max_solutions > 1 and self.chosen_h == 3 else None
+        if selector:
+            self.assumptions.insert(0, selector)
+        self.deadline = time() + max_time if max_time is not None else None
+        self.max_splits = self.split_counter + max_splits if max_splits is not None else None
+        self.pure_depth = -1 if max_solutions > 1 else None
+        self.max_solutions = max_solutions
+        self.solution = None
+        self.solution_count = 0
+        result = False if self.inconsistent else self.solve()
+        # Return to the root level, which only holds literals implied by the clauses
+        if self.trail_lim:
+            self.undo(self.trail_lim[0])
+            self.trail_lim.clear()
+            self.flipped.clear()
+        if selector:
+            self.retire_selector(selector)
+        self.status = 'UNKNOWN' if result is None else 'SAT' if result else 'UNSAT'
+        return result
+
+    def new_selector(self) -> int:
+        """ Creates a fresh variable that appears in no clause yet.
+
+        Returns:
+            int: The new variable.
+        """
+        variable = self.next_selector
+        self.next_selector += 1
+        self.remaining[variable] = None
+        self.activity[variable] = 0.0
+        return variable
+
+    def retire_selector(self, selector: int) -> None:
+        """ Makes a selector false for good, which satisfies every clause it switched on, and deletes its blocking clauses.
+
+        Args:
+            selector (int): The selector of the call that just ended.
+        """
+        if selector not in self.values:
+            self.assign(-selector)
+        for index in self.blocking:
+            for literal in self.clauses[index][:2]:
+                self.watches[literal] = [other for other in self.watches[literal] if other != index]
+            self.clauses[index] = None
+            self.free_slots.append(index)
+        self.blocking.clear()
+
+    def time_methods(self) -> None:
+        """ Replaces the hot methods of this solver by wrappers that add their running time to self.timings.
+            The methods are only wrapped on request, so an untimed solve pays nothing for it.
+        """
+        timings = self.timings
+
+        def timed(name: str, method: Callable) -> Callable:
+            def wrapper():
+                start = perf_counter()
+                try:
+                    return method()
+                finally:
+                    timings[name] += perf_counter() - start
+            return wrapper
+        for name in timings:
+            setattr(self, name, timed(name, getattr(self, name)))
+
+    def stats(self) -> Dict:
+        """ Collects the counters of the last solve.
 
-        # Split using a positive value, otherwise backtrack using a negative value
-        return self.solve(copy.deepcopy(kb), copy.deepcopy(remaining), copy.deepcopy(assignments), True, False) or \
-        self.solve(copy.deepcopy(kb), copy.deepcopy(remaining), copy.deepcopy(assignments), True, True)
+        Returns:
+            Dict: The counters, and the seconds spent in each hot method if timing was turned on.
+        """
+        return {'splits': self.split_counter, 'propagations': self.propagation_counter, 'conflicts': self.conflict_counter,
+                'pure_literals': self.pure_counter, 'backtracks': self.backtrack_counter, 'restarts': self.restart_counter,
+                'max_depth': self.max_depth, 'learned': len(self.learned), **{f"{name}_time": seconds for name, seconds in self.timings.items()}}
 
-    def assign(self, remaining: List, assignments: Dict, variable: str, other: str) -> None:
-        """ Assigns a true or false value to a given variable.
-            Removes the variable from the unassigned variables list. 
+    def load(self, store: ClauseStore) -> bool:
+        """ Sets up the watched literals of every clause in a clause store.
+            Unit clauses are queued for propagation instead of being watched.
 
         Args:
-            remaining (List): The remaining unassigned variables.
-            assignments (Dict): The assigned variables and their assigned values.
-            variable (str): The specified variable.
-            other (str): An other specified variable in case we do not want to remove the actual assigned variable.
-        """
-        if '-' in variable:
-            assignments[variable[1:]] = False
-        else: 
-            assignments[variable] = True
-        # Remove the variable from the list of unsassigned variables.
-        if not self.start:
-            if variable in remaining:
-                remaining.remove(variable)
+            store (ClauseStore): The clauses of the problem.
+
+        Returns:
+            bool: False if the clauses are trivially unsatisfiable, else True.
+        """
+        self.store = store
+        # The clauses of the store are shared, and unit_propagate copies a clause to a list the first time it reorders it
+        self.clauses = list(store.clauses)
+        self.watches = {}
+        self.remaining = dict(store.variables)
+        if self.chosen_h == 2:
+            # VSIDS starts from the occurence count of every variable
+            self.activity = {variable: float(len(store.occurrences.get(variable, ())) + len(store.occurrences.get(-variable, ())))
+                             for variable in store.variables}
+        elif self.chosen_h == 3:
+            self.activity = dict.fromkeys(store.variables, 0.0)
+            self.max_learned = max(len(store) // 3, 2000)
+        if self.chosen_h in (2, 3):
+            self.order = VarHeap(self.activity, store.variables)
+        self.tracking = self.chosen_h != 3
+        if self.tracking:
+            self.true_count = [0] * len(self.clauses)
+            self.free_count = [len(clause) for clause in self.clauses]
+            self.unsat_count = len(self.clauses)
+        self.pure_tracking = self.tracking and (self.pure_depth is None or self.pure_depth >= 0)
+        if self.pure_tracking:
+            self.live_count = {literal: len(indices) for literal, indices in store.occurrences.items()}
+            for variable in store.variables:
+                self.live_count.setdefault(variable, 0)
+                self.live_count.setdefault(-variable, 0)
+            self.pure_candidates = dict(store.variables)
+        if self.chosen_h == 1:
+            self.jw_score = dict.fromkeys(store.variables, 0.0)
+            for index in range(len(self.clauses)):
+                self.add_weight(index, 2.0 ** -self.free_count[index])
+            self.jw_heap = [(-score, variable) for variable, score in self.jw_score.items()]
+            heapq.heapify(self.jw_heap)
+        for index, clause in enumerate(self.clauses):
+            if len(clause) == 0:
+                return False
+            if len(clause) == 1:
+                if self.values.get(clause[0]) is False:
+                    return False
+                if clause[0] not in self.values:
+                    self.assign(clause[0])
+                continue
+            self.watches.setdefault(clause[0], []).append(index)
+            self.watches.setdefault(clause[1], []).append(index)
+        return True
+
+    def solve(self) -> Optional[bool]:
+        """ Solves the problem this solver was loaded with.
+            Searches iteratively: every split opens a new decision level on the trail,
+            and backtracking undoes the trail down to the level being flipped.
+
+        Returns:
+            Optional[bool]: Whether a solution was found or not, or None if a budget ran out.
+        """
+        while True:
+            # Apply the unit clause rule, then the pure literal rule, until neither assigns anything.
+            # Pure literals are not implied by the clauses, so CDCL does not use them.
+            conflict = self.unit_propagate()
+            while conflict is None and self.chosen_h != 3 and self.pure_literal():
+                conflict = self.unit_propagate()
+            # An unsatisfiable clause means the current branch fails
+            if conflict is not None:
+                self.conflict_counter += 1
+                if self.on_conflict:
+                    self.on_conflict(list(self.clauses[conflict]), len(self.trail_lim))
+                # A conflict without decisions means the clauses themselves are unsatisfiable
+                if not self.trail_lim:
+                    self.inconsistent = True
+                if self.chosen_h == 3:
+                    if not self.learn(conflict):
+                        return self.solution_count > 0
+                else:
+                    if self.chosen_h == 2:
+                        # VSIDS bumps the variables of the conflicting clause
+                        for literal in self.clauses[conflict]:
+                            self.bump_variable(abs(literal))
+                    if not self.backtrack():
+                        return self.solution_count > 0
+                self.restart_conflicts += 1
+                if self.restart != 'none' and self.restart_conflicts >= self.restart_interval():
+                    self.restart_search()
+                continue
+            # Decide the assumptions first, in order, as splits that are never flipped
+            if self.assumption_level is None or len(self.trail_lim) < self.assumption_level:
+                literal = next((literal for literal in self.assumptions if self.values.get(literal) is not True), None)
+                if literal is not None:
+                    if self.values.get(literal) is False:
+                        return self.solution_count > 0
+                    self.decide(literal, True)
+                    continue
+                self.assumption_level = len(self.trail_lim)
+            # Check whether the KB is empty
+            if self.kb_empty():
+                solution = {abs(literal): literal > 0 for literal in self.trail}
+                self.solution_count += 1
+                if self.solution is None:
+                    if self.path:
+                        print("SAT ", self.path)
+                    self.solution = solution
+                if self.on_solution:
+                    self.on_solution(solution)
+                if self.solution_count >= self.max_solutions or not self.block_solution():
+                    return True
+                continue
+
+            # Give up before splitting once a budget is used up
+            if self.out_of_budget():
+                return None
+            variable = self.select_variable()
+            # Split using the saved phase if there is one, otherwise using a negative value first
+            if self.phase_saving and self.phase.get(variable):
+                self.decide(variable, False)
             else:
-                remaining.remove(other)
+                self.decide(-variable, False)
+
+    def select_variable(self) -> int:
+        """ Chooses the variable of the next split with the chosen heuristic.
+
+        Returns:
+            int: An unassigned variable.
+        """
+        if self.chosen_h == 0:
+            return next(variable for variable in reversed(self.store.variables) if variable in self.remaining)
+        if self.chosen_h == 1:
+            return self.two_jw()
+        return self.vsids()
+
+    def block_solution(self) -> bool:
+        """ Excludes the solution on the trail, so that the search goes on to the next one.
+            Chronological search backtracks as after a conflict. CDCL adds a clause forbidding the current
+            decisions, which imply the whole solution, and backjumps to assert it.
+
+        Returns:
+            bool: False if no other solution is left, else True.
+        """
+        if self.chosen_h != 3:
+            return self.backtrack()
+        if not self.trail_lim:
+            return False
+        # The negated decisions, most recent first so that the asserting literal is watched
+        blocking = [-self.trail[start] for start in reversed(self.trail_lim)]
+        self.backtrack_counter += 1
+        self.undo(self.trail_lim.pop())
+        self.flipped.pop()
+        if len(blocking) == 1:
+            self.assign(blocking[0])
+        else:
+            index = self.add_clause(blocking)
+            self.blocking.append(index)
+            self.assign(blocking[0], index)
+        return True
 
-    def unit_propagate(self, kb: List, remaining: List, assignments: Dict) -> None:
-        """ Updates the list of clauses based on the unit propagation rule.
+    def out_of_budget(self) -> bool:
+        """ Verifies whether the time or split budget of the search is used up.
+
+        Returns:
+            bool: True if the search must give up, else False.
+        """
+        return (self.max_splits is not None and self.split_counter >= self.max_splits) or \
+            (self.deadline is not None and time() >= self.deadline)
+
+    def restart_interval(self) -> int:
+        """ Computes the number of conflicts allowed before the next restart.
+            The intervals keep growing, so restarting DPLL without learning stays complete.
+
+        Returns:
+            int: The number of conflicts of the current restart interval.
+        """
+        if self.restart == 'luby':
+            return self.restart_base * luby(self.restart_counter + 1)
+        return int(self.restart_base * 1.5 ** self.restart_counter)
+
+    def restart_search(self) -> None:
+        """ Undoes every decision level, keeping the learned clauses, activities and saved phases.
+        """
+        self.restart_counter += 1
+        self.restart_conflicts = 0
+        if self.trail_lim:
+            self.undo(self.trail_lim[0])
+        self.trail_lim.clear()
+        self.flipped.clear()
+
+    def decide(self, literal: int, flipped: bool) -> None:
+        """ Opens a new decision level and assigns a given literal on it.
 
         Args:
-            kb (List): The knowledge base (all of the clauses).
-            remaining (List): The remaining unassigned variables.
-            assignments (Dict): The assigned variables and their assigned values.
-        """
-        def unit(clause: str) -> bool:
-            """ Updates the list of literals for a given clause, if it is a unit clause.
-                Builds a list of unassigned variables if this is the algorithm's first iteration.
-
-            Args:
-                clause (str): The specified clause. 
-
-            Returns:
-                bool: True if a unit clause was found, else false.
-            """
-            nonlocal kb
-            split_clause = clause.split(" ")
-            # Compute the negation of the clause
-            anti = clause[1:] if '-' in clause else f'-{clause}'
-            if len(split_clause) == 1 and (clause in remaining or anti in remaining or self.start):
-                # Set the literal to true/false if it is a unit clause
-                self.assign(remaining, assignments, clause, anti)
-                # Return the clause to store it in a list 
-                kb = [c if anti not in c else format(c.replace(anti, '')) for c in kb if clause not in c or (anti in c and ('-' in anti or clause not in c))] 
+            literal (int): The decision literal.
+            flipped (bool): Whether the opposite value of this literal was already tried.
+        """
+        # New split
+        self.split_counter += 1
+        self.trail_lim.append(len(self.trail))
+        self.flipped.append(flipped)
+        self.max_depth = max(self.max_depth, len(self.trail_lim))
+        if self.on_decision:
+            self.on_decision(literal, len(self.trail_lim))
+        self.assign(literal)
+
+    def backtrack(self) -> bool:
+        """ Undoes decision levels until one whose decision was not yet flipped, then flips it.
+
+        Returns:
+            bool: False if every decision was already flipped (the problem is unsatisfiable), else True.
+        """
+        self.backtrack_counter += 1
+        while self.trail_lim:
+            start = self.trail_lim.pop()
+            literal = self.trail[start]
+            self.undo(start)
+            if not self.flipped.pop():
+                # Backtrack using the positive value
+                self.decide(-literal, True)
                 return True
-            if self.start:
-                # Update the list of unassigned variables for the algorithm's first iteration
-                def update(variable) -> None:
-                    anti = variable[1:] if '-' in variable else f'-{variable}'
-                    if variable not in remaining and variable not in assignments \
-                        and anti not in remaining and anti not in assignments:
-                        remaining.append(variable)
-                [update(s) for s in split_clause]
-            return False
-        while any(list(map(unit, copy.deepcopy(kb)))):
-            if self.start:
-                self.start = False
-            pass
-        return kb, remaining, assignments
-        
-    def pure_literal(self, kb: List, remaining: List, assignments: Dict) -> None:
-        """ Assigns a true or false value to all pure literals
+        return False
+
+    def learn(self, conflict: int) -> bool:
+        """ Learns a clause from a conflict, backjumps and asserts the clause's unassigned literal.
 
         Args:
-            kb (List): The knowledge base (all of the clauses).
-            remaining (List): The remaining unassigned variables.
-            assignments (Dict): The assigned variables and their assigned values.
-        """
-        def verify_pure(variable: str) -> bool:
-            """ Verifies and handles a given unassigned variable on the basis of whether it is a pure literal.
-
-            Args:
-                variable (str): The specified variable.
-            
-            Returns:
-                bool: True if a puire literal was found else false.
-            """
-            nonlocal kb
-            positive, negative = 0, 0
-            # Check that the variable is either only positive or negative in all of the clauses it appears in.
-            for clause in kb:
-                result = clause.find(variable)
-                if result != -1:
-                    if result == 0 or clause[result - 1] != '-':
-                        positive += 1
-                    else: 
-                        negative += 1
-                    if positive > 0 and negative > 0:
-                        break
-            is_pure = not (negative > 0 and positive > 0) and (negative or positive)
-            # Assign the literal a truth value and remove all clauses containing it.
-            if is_pure:
-                normal = (positive > 0 and '-' not in variable) or (negative > 0 and '-' in variable)
-                actual = variable if normal else '-'+variable if negative > 0 else variable[1:]
-                self.assign(remaining, assignments, actual, variable)
-                anti = actual[1:] if '-' in actual else f'-{actual}'
-                kb = [c if anti not in c else format(c.replace(anti, '')) for c in kb if actual not in c or (anti in c and ('-' in anti or actual not in c))] 
-            return is_pure
-        while any(list(map(verify_pure, copy.deepcopy(remaining)))):
-            pass
-        return kb, remaining, assignments
-
-    def kb_empty(self, kb: List) -> bool:
-        """ Verifies whether a given knowledge base is empty.
+            conflict (int): The index of the conflicting clause.
+
+        Returns:
+            bool: False if the conflict happened without decisions (the problem is unsatisfiable), else True.
+        """
+        if not self.trail_lim:
+            return False
+        learned, level = self.analyze(conflict)
+        self.backtrack_counter += 1
+        # Non-chronological backjump to the second highest level of the learned clause
+        self.undo(self.trail_lim[level])
+        del self.trail_lim[level:]
+        del self.flipped[level:]
+        if len(learned) == 1:
+            self.assign(learned[0])
+        else:
+            index = self.add_clause(learned)
+            self.learned.append(index)
+            self.clause_activity[index] = self.clause_inc
+            self.assign(learned[0], index)
+        # Decay all activities by growing the increments instead
+        self.var_inc /= 0.95
+        self.clause_inc /= 0.999
+        if len(self.learned) >= self.max_learned:
+            self.reduce_db()
+        return True
+
+    def analyze(self, conflict: int) -> Tuple[List, int]:
+        """ Derives the first unique implication point (first-UIP) clause of a conflict.
+            Bumps the activity of the variables and learned clauses involved.
 
         Args:
-            kb (List): The knowledge base (all of the clauses).
+            conflict (int): The index of the conflicting clause.
 
         Returns:
-            bool: True if the knowledge base is empty, else False.
+            Tuple[List, int]: The learned clause, with its asserting literal first, and the level to backjump to.
         """
-        return len(kb) == 0
+        current = len(self.trail_lim)
+        seen = set()
+        learned = [0]
+        # Counts the seen literals of the current level that have not been resolved yet
+        pending = 0
+        literal = None
+        position = len(self.trail) - 1
+        index = conflict
+        while True:
+            if index in self.clause_activity:
+                self.bump_clause(index)
+            clause = self.clauses[index]
+            # The implied literal of a reason clause is its first literal
+            for other in (clause if literal is None else clause[1:]):
+                variable = abs(other)
+                if variable in seen or self.level[variable] == 0:
+                    continue
+                seen.add(variable)
+                self.bump_variable(variable)
+                if self.level[variable] == current:
+                    pending += 1
+                else:
+                    learned.append(other)
+            # Resolve on the most recently assigned literal that was seen
+            while abs(self.trail[position]) not in seen:
+                position -= 1
+            literal = self.trail[position]
+            position -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            index = self.reason[abs(literal)]
+        learned[0] = -literal
+        if len(learned) == 1:
+            return learned, 0
+        # Watch the literal of the highest remaining level second, so it is the first to be unassigned
+        highest = max(range(1, len(learned)), key=lambda k: self.level[abs(learned[k])])
+        learned[1], learned[highest] = learned[highest], learned[1]
+        return learned, self.level[abs(learned[1])]
 
-    def empty_clauses(self, kb: List) -> bool:
-        """ Verifies whether the knowledge base contains any empty clause.
+    def add_clause(self, clause: List) -> int:
+        """ Adds a clause of at least two literals to the solver and watches its first two literals.
 
         Args:
-            kb (List): The knowledge base (all of the clauses).
+            clause (List): The literals of the clause.
 
         Returns:
-            bool: True if an empty clause exists, else False.
+            int: The index of the new clause.
         """
-        return any(len(clause) == 0 for clause in kb)
+        if self.free_slots:
+            index = self.free_slots.pop()
+            self.clauses[index] = clause
+        else:
+            index = len(self.clauses)
+            self.clauses.append(clause)
+        self.watches.setdefault(clause[0], []).append(index)
+        self.watches.setdefault(clause[1], []).append(index)
+        return index
 
+    def bump_variable(self, variable: int) -> None:
+        """ Increases the activity of a variable that took part in a conflict.
 
-    def two_jw(self, kb: List) -> str:
-        """ Determines what variable to trackback to
+        Args:
+            variable (int): The specified variable.
+        """
+        self.activity[variable] += self.var_inc
+        self.order.increased(variable)
+        if self.activity[variable] > 1e100:
+            # Rescale every activity to avoid overflowing, which keeps their order
+            for other in self.activity:
+                self.activity[other] *= 1e-100
+            self.var_inc *= 1e-100
+
+    def bump_clause(self, index: int) -> None:
+        """ Increases the activity of a learned clause that took part in a conflict.
+
+        Args:
+            index (int): The index of the learned clause.
+        """
+        self.clause_activity[index] += self.clause_inc
+        if self.clause_activity[index] > 1e20:
+            for other in self.clause_activity:
+                self.clause_activity[other] *= 1e-20
+            self.clause_inc *= 1e-20
+
+    def reduce_db(self) -> None:
+        """ Deletes the less active half of the learned clauses to keep memory bounded.
+            Binary clauses and clauses that are the reason of a current assignment are kept.
+        """
+        def locked(index: int) -> bool:
+            first = self.clauses[index][0]
+            return self.values.get(first) is True and self.reason[abs(first)] == index
+        self.learned.sort(key=self.clause_activity.get)
+        half = len(self.learned) // 2
+        deleted = set(index for index in self.learned[:half] if len(self.clauses[index]) > 2 and not locked(index))
+        for index in deleted:
+            for literal in self.clauses[index][:2]:
+                self.watches[literal] = [other for other in self.watches[literal] if other != index]
+            self.clauses[index] = None
+            del self.clause_activity[index]
+            self.free_slots.append(index)
+        self.learned = [index for index in self.learned if index not in deleted]
+        self.max_learned = int(self.max_learned * 1.1)
+
+    def assign(self, literal: int, reason: Optional[int] = None) -> None:
+        """ Makes a given literal true and queues it for propagation.
+            Removes its variable from the unassigned variables.
+
+        Args:
+            literal (int): The literal that must become true.
+            reason (Optional[int], optional): The index of the clause that implied the literal. Defaults to None.
+        """
+        if self.tracking:
+            self.track_assign(literal)
+        self.values[literal] = True
+        self.values[-literal] = False
+        self.trail.append(literal)
+        self.level[abs(literal)] = len(self.trail_lim)
+        self.reason[abs(literal)] = reason
+        # Remove the variable from the unsassigned variables.
+        del self.remaining[abs(literal)]
+
+    def undo(self, mark: int) -> None:
+        """ Unassigns every literal assigned after a given trail position.
+            Watched literals stay valid on backtracking, so they need no restoring.
+
+        Args:
+            mark (int): The trail length to return to.
+        """
+        for literal in reversed(self.trail[mark:]):
+            del self.values[literal]
+            del self.values[-literal]
+            self.remaining[abs(literal)] = None
+            self.phase[abs(literal)] = literal > 0
+            if self.tracking:
+                self.track_undo(literal)
+            if self.order is not None:
+                self.order.push(abs(literal))
+        del self.trail[mark:]
+        self.qhead = min(self.qhead, mark)
+
+    def track_assign(self, literal: int) -> None:
+        """ Updates the clause counts and Jeroslow-Wang scores for a literal that is about to become true.
+
+        Args:
+            literal (int): The literal that becomes true.
+        """
+        jw = self.chosen_h == 1
+        for index in self.store.occurrences.get(literal, ()):
+            if self.true_count[index] == 0:
+                # The clause becomes satisfied, so none of its literals count anymore
+                self.unsat_count -= 1
+                if jw:
+                    self.add_weight(index, -2.0 ** -self.free_count[index])
+                if self.pure_tracking:
+                    self.remove_occurrences(index)
+            self.true_count[index] += 1
+            self.free_count[index] -= 1
+        for index in self.store.occurrences.get(-literal, ()):
+            if jw and self.true_count[index] == 0:
+                # The clause loses a literal, which doubles the weight of the others
+                weight = 2.0 ** -self.free_count[index]
+                self.jw_score[abs(literal)] -= weight
+                self.add_weight(index, weight, abs(literal))
+            self.free_count[index] -= 1
+
+    def track_undo(self, literal: int) -> None:
+        """ Reverts track_assign for a literal that was just unassigned.
+
+        Args:
+            literal (int): The literal that was true.
+        """
+        jw = self.chosen_h == 1
+        for index in self.store.occurrences.get(-literal, ()):
+            self.free_count[index] += 1
+            if jw and self.true_count[index] == 0:
+                weight = 2.0 ** -self.free_count[index]
+                self.jw_score[abs(literal)] += weight
+                self.add_weight(index, -weight, abs(literal))
+        for index in self.store.occurrences.get(literal, ()):
+            self.free_count[index] += 1
+            self.true_count[index] -= 1
+            if self.true_count[index] == 0:
+                self.unsat_count += 1
+                if jw:
+                    self.add_weight(index, 2.0 ** -self.free_count[index])
+                if self.pure_tracking:
+                    self.restore_occurrences(index)
+        if self.pure_tracking:
+            # The variable is free again, so it may be pure
+            self.pure_candidates[abs(literal)] = None
+        if jw:
+            heapq.heappush(self.jw_heap, (-self.jw_score[abs(literal)], abs(literal)))
+
+    def remove_occurrences(self, index: int) -> None:
+        """ Uncounts the literals of a clause that became satisfied.
+            A literal that no longer occurs in any unsatisfied clause may leave its negation pure.
+
+        Args:
+            index (int): The index of the clause.
+        """
+        live_count = self.live_count
+        for literal in self.store.clauses[index]:
+            live_count[literal] -= 1
+            if not live_count[literal]:
+                self.pure_candidates[abs(literal)] = None
+
+    def restore_occurrences(self, index: int) -> None:
+        """ Counts again the literals of a clause that is no longer satisfied.
+            A literal that occurs again in an unsatisfied clause may be pure if its negation does not.
 
         Args:
-            kb (List): The knowledge base (all of the clauses).
-            remaning: The remaining variables
+            index (int): The index of the clause.
+        """
+        live_count = self.live_count
+        for literal in self.store.clauses[index]:
+            live_count[literal] += 1
+            if live_count[literal] == 1:
+                self.pure_candidates[abs(literal)] = None
+
+    def add_weight(self, index: int, weight: float, exclude: int = 0) -> None:
+        """ Adds a weight to the Jeroslow-Wang score of every unassigned variable of a clause.
+
+        Args:
+            index (int): The index of the clause.
+            weight (float): The weight to add, negative to remove it.
+            exclude (int, optional): A variable to leave out. Defaults to 0.
+        """
+        for literal in self.clauses[index]:
+            variable = abs(literal)
+            if literal in self.values or variable == exclude:
+                continue
+            self.jw_score[variable] += weight
+            # Raised scores need a fresh heap entry, lowered ones are fixed lazily when popped
+            if weight > 0 and variable in self.remaining:
+                heapq.heappush(self.jw_heap, (-self.jw_score[variable], variable))
+
+    def unit_propagate(self) -> Optional[int]:
+        """ Propagates the queued assignments using two watched literals per clause.
+            Only the clauses watching the negation of an assigned literal are visited.
 
         Returns:
-            str: The variable with the highest value according two TS-JW
-        """
-        all_lit = {}
-        for clause in kb:
-            clause = clause.replace('-',"")
-            a = clause.split(" ")
-            for literal in a:
-                leng = 2**-len(a)
-                if literal in all_lit:
-                    all_lit[literal] += leng 
+            Optional[int]: The index of a conflicting clause, or None if there is no conflict.
+        """
+        values = self.values
+        watches = self.watches
+        start = self.qhead
+        while self.qhead < len(self.trail):
+            false_literal = -self.trail[self.qhead]
+            self.qhead += 1
+            watching = watches.get(false_literal)
+            if not watching:
+                continue
+            kept = []
+            for position, index in enumerate(watching):
+                clause = self.clauses[index]
+                if clause.__class__ is not list:
+                    clause = self.clauses[index] = list(clause)
+                # Keep the falsified watch in the second position
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], false_literal
+                other = clause[0]
+                if values.get(other) is True:
+                    kept.append(index)
+                    continue
+                # Look for a replacement watch that is not false
+                for k in range(2, len(clause)):
+                    if values.get(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], false_literal
+                        watches.setdefault(clause[1], []).append(index)
+                        break
                 else:
-                    all_lit.update({literal:leng})
-        b = max(all_lit, key=all_lit.get)
-        return b
+                    kept.append(index)
+                    if values.get(other) is False:
+                        # Conflict: keep the remaining watches and report the clause
+                        kept.extend(watching[position + 1:])
+                        watches[false_literal] = kept
+                        self.propagation_counter += self.qhead - start
+                        return index
+                    # The clause became a unit clause
+                    self.assign(other, index)
+            watches[false_literal] = kept
+        self.propagation_counter += self.qhead - start
+        return None
 
-    def vsids(self, remaining: List, kb: List) -> str:
-        """ Determines what variable to trackback to for VSIDS
+    def pure_literal(self) -> bool:
+        """ Assigns a true value to the pure literals of the unsatisfied clauses.
+            Only the variables whose occurrence counts changed since the last call are checked.
 
-        Args:
-            remaining (List): The remaining variables.
-            kb (List): The knowledge base (all of the clauses) 
+        Returns:
+            bool: True if a pure literal was found, else False.
+        """
+        if not self.pure_tracking or (self.pure_depth is not None and len(self.trail_lim) > self.pure_depth):
+            return False
+        # Pure literals are not implied, so incremental calls only use them above the assumptions, never at the root level
+        if self.incremental and (self.assumption_level is None or len(self.trail_lim) <= self.assumption_level):
+            return False
+        candidates, self.pure_candidates = self.pure_candidates, {}
+        live_count = self.live_count
+        found = 0
+        for variable in candidates:
+            if variable not in self.remaining:
+                continue
+            positive, negative = live_count[variable] > 0, live_count[-variable] > 0
+            if positive != negative:
+                self.assign(variable if positive else -variable)
+                found += 1
+        self.pure_counter += found
+        return found > 0
+
+    def kb_empty(self) -> bool:
+        """ Verifies whether every clause of the knowledge base is satisfied.
 
         Returns:
-            str: The variable with the highest value according to VSIDS
-        """
-        if self.exists_var_counter == False:
-            # Count variable occurences
-            for clause in kb:
-                clause = clause.split(' ')
-                for variable in clause:
-                    if variable[0] == '-':
-                        variable = variable[1:]
-                    if variable not in self.var_counter:
-                        self.var_counter[variable] = 0
-                    self.var_counter[variable] += 1.0
-            self.exists_var_counter = True
-        else:
-            # Periodically decay by 5%
-            self.var_counter = {key: value * 0.95 for key, value in self.var_counter.items()}
-        
-        sorted_counter = sorted(self.var_counter.items(), key=lambda x:x[1])
-
-        # Choose variable to assign, if already assigned
-        to_assign = sorted_counter.pop()[0]
-        while to_assign not in remaining:
-            to_assign = sorted_counter.pop()[0]
-        
-        return to_assign
\ No newline at end of file
+            bool: True if the knowledge base is empty, else False.
+        """
+        # A complete assignment without conflicts satisfies every clause
+        if not self.remaining:
+            return True
+        # CDCL only stops once every variable is assigned, as does counting
+        if self.chosen_h == 3 or self.max_solutions > 1:
+            return False
+        return self.unsat_count == 0
+
+
+    def two_jw(self) -> int:
+        """ Determines what variable to trackback to
+
+        Returns:
+            int: The variable with the highest value according two TS-JW
+        """
+        # Drop the outdated entries once they outnumber the useful ones
+        if len(self.jw_heap) > 4 * len(self.jw_score) + 1024:
+            self.jw_heap = [(-self.jw_score[variable], variable) for variable in self.remaining]
+            heapq.heapify(self.jw_heap)
+        while True:
+            score, variable = heapq.heappop(self.jw_heap)
+            if variable not in self.remaining:
+                continue
+            # The score went down since this entry was pushed
+            if -score != self.jw_score[variable]:
+                heapq.heappush(self.jw_heap, (-self.jw_score[variable], variable))
+                continue
+            return variable
+
+    def vsids(self) -> int:
+        """ Determines what variable to trackback to for VSIDS
+
+        Returns:
+            int: The variable with the highest value according to VSIDS
+        """
+        if self.chosen_h == 2:
+            # Decay every activity by 5% per split, by growing the bump increment instead
+            self.var_inc /= 0.95
+            if self.var_inc > 1e100:
+                for variable in self.activity:
+                    self.activity[variable] *= 1e-100
+                self.var_inc *= 1e-100
+        # Choose variable to assign, skipping the assigned ones
+        to_assign = self.order.pop()
+        while to_assign not in self.remaining:
+            to_assign = self.order.pop()
+
+        return to_assign
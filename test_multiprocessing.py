@@ -7,7 +7,7 @@ def solve(dpll: DPLL, path: str,  heuristic: str):
     initial = time()
     dpll.find_solution(f"testset/{path}.cnf", heuristic)
     delta = time() - initial
-    data = [heuristic, path, delta, dpll.split_counter]
+    data = [heuristic, path, delta, dpll.split_counter, dpll.restart_counter]
     return data
 
 
@@ -23,5 +23,5 @@ if __name__ == "__main__":
     # Write the results to a csv file
     with open("results.csv", "w") as f:
         writer = csv.writer(f)
-        writer.writerow(("Heuristic", "Sudoku", "Time", "Branching Frequency"))
+        writer.writerow(("Heuristic", "Sudoku", "Time", "Branching Frequency", "Restarts"))
         writer.writerows((line for line in result))
@@ -1,21 +1,55 @@
-from operator import itemgetter
+import argparse
 import solver
 import sys
 
+# Exit status of the command line for every solver status, so that scripts can tell the outcomes apart
+EXIT_STATUS = {'SAT': 0, 'UNSAT': 1, 'UNKNOWN': 3}
 
-if __name__ == "__main__":
+
+def main(argv=None):
+    """ Solves one DIMACS or .cnfb file and writes the solution to output.txt, or only the status
+        line if there is no solution.
+
+    Args:
+        argv (Optional[List[str]], optional): The command line arguments, the path to the file and
+            optionally the heuristic number. Defaults to sys.argv.
+
+    Returns:
+        str: The status of the solve.
+    """
+    parser = argparse.ArgumentParser(description="Solve a DIMACS or .cnfb file and write the solution to a file.")
+    parser.add_argument("path", help="path to the .cnf or .cnfb file")
+    parser.add_argument("heuristic", nargs="?", default="3", choices=solver.HEURISTICS, help="heuristic number")
+    parser.add_argument("-o", "--output", default="output.txt", help="path the solution is written to")
+    parser.add_argument("-t", "--max-time", type=float, default=None, help="seconds the solve may take")
+    parser.add_argument("--sudoku", type=int, metavar="N", default=None,
+                        help="the file encodes an N x N Sudoku: print the solved grid and check it")
+    args = parser.parse_args(argv)
     dpll = solver.DPLL()
-    dpll.find_solution(sys.argv[1],sys.argv[2])
-    solution_values = [k if v else "-" + k for k, v in sorted({k: dpll.solution[k] for k in sorted(dpll.solution)}.items(), key=itemgetter(1), reverse = True)]
-    out_file = "output.txt"
-    out  = open(out_file, 'w')
-    out.write(f"p cnf {len(solution_values)} {len(solution_values)} \n")
-    for b in solution_values:
-        out.write(f"{b} ")
-        out.write("0\n")
+    dpll.find_solution(args.path, args.heuristic, max_time=args.max_time)
+    with open(args.output, 'w') as out:
+        if dpll.status != 'SAT':
+            out.write(f"s {dpll.status}\n")
+        else:
+            out.write(f"p cnf {len(dpll.solution)} {len(dpll.solution)} \n")
+            out.writelines(f"{k if v else -k} 0\n" for k, v in sorted(dpll.solution.items()))
+    if dpll.status != 'SAT':
+        print(dpll.status)
+        return dpll.status
+    if args.sudoku:
+        # Only Sudokus need NumPy, plain CNF files are solved without loading it
+        import decode
+        grid = decode.decode_solution(args.sudoku, dpll.solution)
+        print(decode.grid_to_line(grid), "valid" if decode.check_grid(grid) else "INVALID")
+    return dpll.status
+
+
+if __name__ == "__main__":
+    sys.exit(EXIT_STATUS[main()])
 
     #example: python3 test.py sudoku/sudoku2.cnf 1
-    
+
     # 0 for basic
     # 1 for Jeroslow Wang
     # 2 for VSIDS
+    # 3 for CDCL